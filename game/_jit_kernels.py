@@ -0,0 +1,123 @@
+"""Numba versions of the line and board kernels of `game.tic_tac_toe`, imported lazily by `game.kernels`.
+
+The kernels follow the pure Python functions step by step, including the order the lines are checked in, so they return
+exactly the same values. Compiled code is cached on disk next to this module or in NUMBA_CACHE_DIR.
+"""
+from numba import njit
+
+
+@njit(cache=True)
+def _cells_winner(board, row, column, row_step, column_step, length, winning_length):
+    last = 0
+    count = 0
+    for i in range(length):
+        x = board[row + i * row_step, column + i * column_step]
+        if x == last:
+            count += 1
+        else:
+            last = x
+            count = 1
+        if last != 0 and count >= winning_length:
+            return last
+    return 0
+
+
+@njit(cache=True)
+def _evaluate_cells(board, row, column, row_step, column_step, length, winning_length):
+    count = 0
+    last_side = 0
+    score = 0
+    neutrals = 0
+
+    for i in range(length):
+        x = board[row + i * row_step, column + i * column_step]
+        if x == last_side:
+            count += 1
+            if count == winning_length and neutrals == 0:
+                return 100000 * x
+        elif x == 0:
+            neutrals += 1
+        elif x == -last_side:
+            if neutrals + count >= winning_length:
+                score += (count - 1) * last_side
+            count = 1
+            last_side = x
+            neutrals = 0
+        else:
+            last_side = x
+            count = 1
+
+    if neutrals + count >= winning_length:
+        score += (count - 1) * last_side
+
+    return score
+
+
+@njit(cache=True)
+def determine_line_winner(line, winning_length):
+    return _cells_winner(line.reshape(1, -1), 0, 0, 0, 1, line.shape[0], winning_length)
+
+
+@njit(cache=True)
+def evaluate_line(line, winning_length):
+    return _evaluate_cells(line.reshape(1, -1), 0, 0, 0, 1, line.shape[0], winning_length)
+
+
+@njit(cache=True)
+def determine_board_winner(board, winning_length):
+    rows, columns = board.shape
+
+    for row in range(rows):
+        winner = _cells_winner(board, row, 0, 0, 1, columns, winning_length)
+        if winner != 0:
+            return winner
+
+    for column in range(columns):
+        winner = _cells_winner(board, 0, column, 1, 0, rows, winning_length)
+        if winner != 0:
+            return winner
+
+    # diagonals of the board flipped upside down, the same order as board[::-1, :].diagonal(i)
+    for offset in range(-rows + 1, columns):
+        row, column = (rows - 1, offset) if offset >= 0 else (rows - 1 + offset, 0)
+        length = min(row + 1, columns - column)
+        if length >= winning_length:
+            winner = _cells_winner(board, row, column, -1, 1, length, winning_length)
+            if winner != 0:
+                return winner
+
+    for offset in range(columns - 1, -rows, -1):
+        row, column = (0, offset) if offset >= 0 else (-offset, 0)
+        length = min(rows - row, columns - column)
+        if length >= winning_length:
+            winner = _cells_winner(board, row, column, 1, 1, length, winning_length)
+            if winner != 0:
+                return winner
+
+    return 0
+
+
+@njit(cache=True)
+def evaluate(board, winning_length):
+    board_width, board_height = board.shape
+    score = 0
+
+    for x in range(board_width):
+        score += _evaluate_cells(board, x, 0, 0, 1, board_height, winning_length)
+    for y in range(board_height):
+        score += _evaluate_cells(board, 0, y, 1, 0, board_width, winning_length)
+
+    diagonals_start = -(board_width - winning_length)
+    diagonals_end = board_width - winning_length
+    for d in range(diagonals_start, diagonals_end + 1):
+        first = max(-d, 0)
+        length = min(board_width, board_height - d) - first
+        if length > 0:
+            score += _evaluate_cells(board, first, first + d, 1, 1, length, winning_length)
+    for d in range(diagonals_start, diagonals_end + 1):
+        first = max(-d, 0)
+        length = min(board_width, board_height - d) - first
+        if length > 0:
+            score += _evaluate_cells(board, first, board_height - first - d - 1, 1, -1, length, winning_length)
+
+    return score
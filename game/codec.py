@@ -0,0 +1,248 @@
+import functools
+import math
+import time
+
+import numpy as np
+
+# cell values 0, 1 and -1 are stored as the codes 0, 1 and 2
+_SHIFTS = np.array([0, 2, 4, 6], dtype=np.uint8)
+
+
+def pack_boards(boards):
+    """
+    Packs boards into 2 bits per cell.
+
+    Args:
+        boards: Array of shape (N, size, size) or (N, squares) with values 0, 1 and -1.
+
+    Returns:
+        Array of uint8 of shape (N, ceil(squares / 4)).
+    """
+    boards = np.asarray(boards)
+    # explicit sizes, -1 cannot be inferred for an empty batch
+    codes = (boards.reshape(len(boards), int(np.prod(boards.shape[1:]))) % 3).astype(np.uint8)
+    padding = -codes.shape[1] % 4
+    if padding:
+        codes = np.pad(codes, ((0, 0), (0, padding)), mode='constant')
+    codes = codes.reshape(len(codes), codes.shape[1] // 4, 4) << _SHIFTS
+
+    return np.bitwise_or.reduce(codes, axis=2)
+
+
+def unpack_boards(packed, size):
+    """
+    Unpacks boards packed with `pack_boards`.
+
+    Args:
+        packed: Array of uint8 of shape (N, ceil(size * size / 4)).
+        size: The size of the side of the board.
+
+    Returns:
+        Array of int8 of shape (N, size, size).
+    """
+    packed = np.asarray(packed, dtype=np.uint8)
+    codes = ((packed[:, :, np.newaxis] >> _SHIFTS) & 3).reshape(len(packed), packed.shape[1] * 4)[:, :size * size]
+    boards = codes.astype(np.int8)
+    boards[codes == 2] = -1
+
+    return boards.reshape(-1, size, size)
+
+
+def pack_board(board):
+    """Returns the board packed into bytes with 2 bits per cell."""
+    return pack_boards(np.asarray(board)[np.newaxis])[0].tobytes()
+
+
+def unpack_board(data, size):
+    """Returns the board of the given size from the bytes created with `pack_board`."""
+    return unpack_boards(np.frombuffer(data, dtype=np.uint8)[np.newaxis], size)[0]
+
+
+@functools.lru_cache(maxsize=None)
+def _powers_of_three(squares):
+    if squares > 39:
+        raise ValueError("Base 3 codes of boards with {} squares do not fit in 64 bits".format(squares))
+    powers = 3 ** np.arange(squares, dtype=np.int64)
+    powers.setflags(write=False)
+    return powers
+
+
+def encode_base3(boards):
+    """
+    Encodes boards as base 3 integers, the cell (i, j) is the digit i * size + j.
+
+    Args:
+        boards: Array of shape (..., size, size), at most 39 cells.
+
+    Returns:
+        Array of int64 of shape (...).
+    """
+    boards = np.asarray(boards)
+    codes = boards.reshape(*boards.shape[:-2], boards.shape[-2] * boards.shape[-1]) % 3
+    return codes.astype(np.int64).dot(_powers_of_three(codes.shape[-1]))
+
+
+def decode_base3(codes, size):
+    """
+    Decodes boards encoded with `encode_base3`.
+
+    Returns:
+        Array of int8 of shape (..., size, size).
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    digits = (codes[..., np.newaxis] // _powers_of_three(size * size)) % 3
+    boards = digits.astype(np.int8)
+    boards[digits == 2] = -1
+
+    return boards.reshape(*codes.shape, size, size)
+
+
+@functools.lru_cache(maxsize=None)
+def _binomials(squares):
+    binomials = np.zeros((squares + 1, squares + 2), dtype=np.int64)
+    binomials[:, 0] = 1
+    for n in range(1, squares + 1):
+        binomials[n, 1:] = binomials[n - 1, 1:] + binomials[n - 1, :-1]
+    binomials.setflags(write=False)
+    return binomials
+
+
+@functools.lru_cache(maxsize=None)
+def stone_count_offsets(size):
+    """
+    Returns the index of the first state with the given number of stones, the states are ordered by the number of
+    stones. The last element is the number of all states.
+
+    Args:
+        size: The size of the side of the board.
+
+    Returns:
+        Array of int64 of shape (size * size + 2,).
+
+    Raises:
+        ValueError: If the number of states does not fit in 64 bits, from 7x7 boards upwards.
+    """
+    squares = size * size
+    # counted with python integers, which do not overflow, before anything is stored in int64
+    counts = [math.comb(squares, (stones + 1) // 2) * math.comb(squares - (stones + 1) // 2, stones // 2)
+              for stones in range(squares + 1)]
+    if sum(counts) > np.iinfo(np.int64).max:
+        raise ValueError("Indices of the states of {0}x{0} boards do not fit in 64 bits".format(size))
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    offsets.setflags(write=False)
+    return offsets
+
+
+def state_count(size):
+    """Returns the number of boards where the first player has as many stones as the second player or one more."""
+    return int(stone_count_offsets(size)[-1])
+
+
+def rank_boards(boards):
+    """
+    Returns the perfect index of every board. Boards are ordered by the number of stones, then by the combination of
+    the first player's cells and then by the combination of the second player's cells among the remaining ones.
+
+    Args:
+        boards: Array of shape (N, size, size) where the first player has as many stones as the second player or
+            one more.
+
+    Returns:
+        Array of int64 of shape (N,) with values in range(state_count(size)).
+
+    Raises:
+        ValueError: If the stone counts are not legal or the indices do not fit in 64 bits.
+    """
+    boards = np.asarray(boards)
+    size = boards.shape[-1]
+    squares = size * size
+    offsets = stone_count_offsets(size)
+    flat = boards.reshape(-1, squares)
+    binomials = _binomials(squares)
+    positions = np.arange(squares)
+
+    first = flat == 1
+    second = flat == -1
+    first_count = first.sum(axis=1)
+    second_count = second.sum(axis=1)
+    if np.any((first_count - second_count != 0) & (first_count - second_count != 1)):
+        raise ValueError("The first player has to have as many stones as the second player or one more")
+
+    first_before = np.cumsum(first, axis=1) - first
+    second_before = np.cumsum(second, axis=1) - second
+    first_rank = np.where(first, binomials[positions, first_before + 1], 0).sum(axis=1)
+    second_rank = np.where(second, binomials[positions - first_before, second_before + 1], 0).sum(axis=1)
+
+    return (offsets[first_count + second_count] +
+            first_rank * binomials[squares - first_count, second_count] + second_rank)
+
+
+def unrank_boards(indices, size):
+    """
+    Returns the boards of the given perfect indices, the inverse of `rank_boards`.
+
+    Returns:
+        Array of int8 of shape (N, size, size).
+    """
+    indices = np.asarray(indices, dtype=np.int64)
+    squares = size * size
+    offsets = stone_count_offsets(size)
+    binomials = _binomials(squares)
+
+    stones = np.searchsorted(offsets, indices, side='right') - 1
+    first_count = (stones + 1) // 2
+    second_count = stones // 2
+    first_rank, second_rank = np.divmod(indices - offsets[stones], binomials[squares - first_count, second_count])
+
+    boards = np.zeros((len(indices), squares), dtype=np.int8)
+    remaining = first_count.copy()
+    for position in range(squares - 1, -1, -1):
+        chosen = (remaining > 0) & (first_rank >= binomials[position, remaining])
+        first_rank -= np.where(chosen, binomials[position, remaining], 0)
+        remaining -= chosen
+        boards[chosen, position] = 1
+
+    free_before = np.arange(squares) - (np.cumsum(boards == 1, axis=1) - (boards == 1))
+    remaining = second_count.copy()
+    for position in range(squares - 1, -1, -1):
+        free = boards[:, position] == 0
+        binomial = binomials[free_before[:, position], remaining]
+        chosen = free & (remaining > 0) & (second_rank >= binomial)
+        second_rank -= np.where(chosen, binomial, 0)
+        remaining -= chosen
+        boards[chosen, position] = -1
+
+    return boards.reshape(-1, size, size)
+
+
+def _benchmark(name, function, items, repeats=3):
+    best = min(_timed(function) for _ in range(repeats))
+    print("%s: %.0f boards/sec" % (name, items / best))
+
+
+def _timed(function):
+    start = time.time()
+    function()
+    return time.time() - start
+
+
+if __name__ == '__main__':
+    random_state = np.random.RandomState(0)
+    for size, count in ((3, 1000000), (4, 1000000), (15, 100000)):
+        boards = random_state.randint(-1, 2, (count, size, size))
+        packed = pack_boards(boards)
+        print("%sx%s: %s bytes as int64, %s bytes packed" % (size, size, boards.astype(np.int64)[0].nbytes,
+                                                             packed[0].nbytes))
+        _benchmark("  pack", lambda: pack_boards(boards), count)
+        _benchmark("  unpack", lambda: unpack_boards(packed, size), count)
+        if size * size <= 39:
+            codes = encode_base3(boards)
+            _benchmark("  encode base 3", lambda: encode_base3(boards), count)
+            _benchmark("  decode base 3", lambda: decode_base3(codes, size), count)
+
+    for size in (3, 4):
+        indices = np.arange(min(state_count(size), 1000000))
+        boards = unrank_boards(indices, size)
+        print("%sx%s: %s states" % (size, size, state_count(size)))
+        _benchmark("  rank", lambda: rank_boards(boards), len(indices))
+        _benchmark("  unrank", lambda: unrank_boards(indices, size), len(indices))
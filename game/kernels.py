@@ -0,0 +1,103 @@
+import importlib
+import time
+
+import numpy as np
+
+from game import tic_tac_toe
+
+_jit = None
+_loaded = False
+
+
+def _kernels():
+    """Imports the numba kernels on the first call, returns None when numba is not installed."""
+    global _jit, _loaded
+    if not _loaded:
+        try:
+            _jit = importlib.import_module('game._jit_kernels')
+        except ImportError:
+            _jit = None
+        _loaded = True
+    return _jit
+
+
+def jit_available():
+    """Returns True if the kernels are compiled with numba, False if the pure Python versions are used."""
+    return _kernels() is not None
+
+
+def determine_line_winner(line, winning_length):
+    """The same as `tic_tac_toe.determine_line_winner`, compiled when numba is installed."""
+    jit = _kernels()
+    if jit is None:
+        return tic_tac_toe.determine_line_winner(line, winning_length)
+    return int(jit.determine_line_winner(np.asarray(line), winning_length))
+
+
+def evaluate_line(line, winning_length):
+    """The same as `tic_tac_toe._evaluate_line`, compiled when numba is installed."""
+    jit = _kernels()
+    if jit is None:
+        return tic_tac_toe._evaluate_line(line, winning_length)
+    return int(jit.evaluate_line(np.asarray(line), winning_length))
+
+
+def determine_board_winner(board, winning_length):
+    """The same as `tic_tac_toe.determine_board_winner`, compiled when numba is installed."""
+    jit = _kernels()
+    if jit is None:
+        return tic_tac_toe.determine_board_winner(board, winning_length)
+    return int(jit.determine_board_winner(np.asarray(board), winning_length))
+
+
+def evaluate(board, winning_length):
+    """The same as `tic_tac_toe.evaluate`, compiled when numba is installed."""
+    jit = _kernels()
+    if jit is None:
+        return tic_tac_toe.evaluate(board, winning_length)
+    return int(jit.evaluate(np.asarray(board), winning_length))
+
+
+def warm_up(dtypes=(np.int64, np.int8)):
+    """
+    Compiles the kernels for boards of the given types, or loads them from the disk cache when they were compiled
+    before. Workers can call it once on start so that the first game is not slowed down.
+
+    Returns:
+        float: Seconds spent.
+    """
+    start = time.time()
+    for dtype in dtypes:
+        board = np.zeros((3, 3), dtype=dtype)
+        determine_line_winner(board[0], 3)
+        evaluate_line(board[0], 3)
+        determine_board_winner(board, 3)
+        evaluate(board, 3)
+    return time.time() - start
+
+
+def _random_boards(size, count, random_state):
+    boards = random_state.randint(-1, 2, (count, size, size))
+    boards[random_state.rand(count, size, size) < .5] = 0
+    return boards
+
+
+def _calls_per_second(function, boards, winning_length):
+    start = time.time()
+    for board in boards:
+        function(board, winning_length)
+    return len(boards) / (time.time() - start)
+
+
+if __name__ == '__main__':
+    print("numba kernels available: %s, warm up: %.3fs" % (jit_available(), warm_up()))
+
+    random_state = np.random.RandomState(0)
+    for size, winning_length, count in ((3, 3, 20000), (7, 4, 5000), (15, 5, 1000), (19, 5, 500)):
+        boards = _random_boards(size, count, random_state)
+        for name, python, compiled in (('winner', tic_tac_toe.determine_board_winner, determine_board_winner),
+                                       ('evaluate', tic_tac_toe.evaluate, evaluate)):
+            python_speed = _calls_per_second(python, boards, winning_length)
+            compiled_speed = _calls_per_second(compiled, boards, winning_length)
+            print("%sx%s %s: python: %.0f boards/sec kernels: %.0f boards/sec speedup: %.1fx" %
+                  (size, size, name, python_speed, compiled_speed, compiled_speed / python_speed))
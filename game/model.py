@@ -7,9 +7,10 @@ from keras.layers import Dense, Dropout
 from sklearn.linear_model import Ridge
 from sklearn.preprocessing import StandardScaler
 
+from game.tablebase import Tablebase
+
 if __name__ == '__main__':
-    X = np.load('X.npy')
-    Y = np.load('Y.npy')
+    X, Y = Tablebase.load_or_solve(3, 3).labels()
 
     clf = Ridge(alpha=1.0)
     clf.fit(X, Y)
@@ -0,0 +1,243 @@
+import os
+import resource
+import time
+import tracemalloc
+
+import numpy as np
+
+from game.codec import rank_boards, state_count, stone_count_offsets, unrank_boards
+from game.threat_space import line_windows
+
+WIN, DRAW, LOSS = 1, 0, -1
+DEFAULT_DIRECTORY = 'tablebases'
+
+# scores order the results of a move from the best to the worst: a win in fewer moves, a draw, a loss in more moves
+_SCORE_BASE = 512
+
+
+def _score(values, distances):
+    return values.astype(np.int16) * (_SCORE_BASE - distances.astype(np.int16))
+
+
+def tablebase_paths(size, winning_length, directory=None):
+    """Returns the paths of the values and the distances arrays of the tablebase."""
+    prefix = os.path.join(directory or DEFAULT_DIRECTORY, '{0}x{0}_{1}'.format(size, winning_length))
+    return prefix + '_values.npy', prefix + '_distances.npy'
+
+
+def side_to_move(boards):
+    """Returns 1 for the boards where the first player moves next, -1 for the second player."""
+    boards = np.asarray(boards)
+    stones = np.count_nonzero(boards.reshape(len(boards), int(np.prod(boards.shape[1:]))), axis=1)
+    return np.where(stones % 2 == 0, 1, -1).astype(np.int8)
+
+
+def line_owners(boards, size, winning_length):
+    """
+    Returns which players have a line of `winning_length` stones.
+
+    Args:
+        boards: Array of shape (N, size, size) or (N, squares).
+        size: The size of the side of the board.
+        winning_length: The number of moves in a row needed for a win.
+
+    Returns:
+        Tuple of two bool arrays of shape (N,), for the first and for the second player.
+    """
+    boards = np.asarray(boards, dtype=np.int8)
+    windows = line_windows(size, winning_length)
+    sums = boards.reshape(len(boards), size * size)[:, windows].sum(axis=2, dtype=np.int8)
+    return (sums == winning_length).any(axis=1), (sums == -winning_length).any(axis=1)
+
+
+def _solve_chunk(boards, side, size, winning_length, values, distances):
+    """
+    Returns the values and the distances to the end of the boards with the same number of stones, `values` and
+    `distances` have to be already solved for the boards with one stone more.
+    """
+    first_line, second_line = line_owners(boards, size, winning_length)
+    mover_line, last_mover_line = (first_line, second_line) if side == 1 else (second_line, first_line)
+    empty = boards == 0
+    empty_count = empty.sum(axis=1)
+
+    # a line of the side to move can not come up in a game, such boards are only valued for the completeness
+    chunk_values = np.where(last_mover_line, LOSS, np.where(mover_line, WIN, DRAW)).astype(np.int8)
+    chunk_distances = np.zeros(len(boards), dtype=np.uint8)
+
+    playing = np.flatnonzero(~(first_line | second_line) & (empty_count > 0))
+    best = np.full(len(playing), np.iinfo(np.int16).min, dtype=np.int16)
+    for square in range(boards.shape[1]):
+        rows = np.flatnonzero(empty[playing, square])
+        children = boards[playing[rows]]
+        children[:, square] = side
+        child_indices = rank_boards(children.reshape(-1, size, size))
+        score = _score(-values[child_indices], distances[child_indices] + 1)
+        best[rows] = np.maximum(best[rows], score)
+
+    chunk_values[playing] = np.sign(best)
+    chunk_distances[playing] = np.where(best == 0, empty_count[playing], _SCORE_BASE - np.abs(best))
+    return chunk_values, chunk_distances
+
+
+def solve(size, winning_length, directory=None, chunk_size=1 << 16):
+    """
+    Solves every position of the game by backward induction over the perfect state index of `game.codec`. The layers
+    of positions with the same number of stones are solved from the full boards to the empty board, every layer only
+    needs the values of the layer with one stone more.
+
+    Args:
+        size: The size of the side of the board.
+        winning_length: The number of moves in a row needed for a win.
+        directory: Directory of the memory mapped arrays, `DEFAULT_DIRECTORY` by default.
+        chunk_size: Number of positions solved at once, bounds the memory of the temporary arrays.
+
+    Returns:
+        Tablebase: The solved tablebase opened read only.
+    """
+    values_path, distances_path = tablebase_paths(size, winning_length, directory)
+    os.makedirs(os.path.dirname(values_path), exist_ok=True)
+    count = state_count(size)
+    values = np.lib.format.open_memmap(values_path, mode='w+', dtype=np.int8, shape=(count,))
+    distances = np.lib.format.open_memmap(distances_path, mode='w+', dtype=np.uint8, shape=(count,))
+
+    offsets = stone_count_offsets(size)
+    for stones in range(size * size, -1, -1):
+        side = 1 if stones % 2 == 0 else -1
+        for start in range(offsets[stones], offsets[stones + 1], chunk_size):
+            end = min(start + chunk_size, offsets[stones + 1])
+            boards = unrank_boards(np.arange(start, end), size).reshape(end - start, -1)
+            chunk_values, chunk_distances = _solve_chunk(boards, side, size, winning_length, values, distances)
+            values[start:end], distances[start:end] = chunk_values, chunk_distances
+
+    values.flush()
+    distances.flush()
+    del values, distances
+    return Tablebase.load(size, winning_length, directory)
+
+
+class Tablebase:
+    """Game theoretic values of all the positions of a game, indexed with `game.codec.rank_boards`.
+
+    Values are from the perspective of the side to move: 1 for a win, 0 for a draw, -1 for a loss with perfect play of
+    both sides. Distances are the numbers of moves to the end of the game, when the winner wins as fast as possible and
+    the loser defends as long as possible. A draw always ends on the full board.
+
+    Args:
+        values: Array of int8 of shape (state_count(size),).
+        distances: Array of uint8 of shape (state_count(size),).
+        size: The size of the side of the board.
+        winning_length: The number of moves in a row needed for a win.
+    """
+
+    def __init__(self, values, distances, size, winning_length):
+        self.values = values
+        self.distances = distances
+        self.size = size
+        self.winning_length = winning_length
+
+    @classmethod
+    def load(cls, size, winning_length, directory=None):
+        values_path, distances_path = tablebase_paths(size, winning_length, directory)
+        return cls(np.load(values_path, mmap_mode='r'), np.load(distances_path, mmap_mode='r'), size, winning_length)
+
+    @classmethod
+    def load_or_solve(cls, size, winning_length, directory=None):
+        if all(os.path.exists(path) for path in tablebase_paths(size, winning_length, directory)):
+            return cls.load(size, winning_length, directory)
+        return solve(size, winning_length, directory)
+
+    def lookup(self, board):
+        """
+        Returns the value and the distance to the end of the board.
+
+        Returns:
+            tuple: Value for the side to move and the number of moves to the end.
+        """
+        index = rank_boards(np.asarray(board).reshape(1, self.size, self.size))[0]
+        return int(self.values[index]), int(self.distances[index])
+
+    def move_values(self, board):
+        """
+        Returns the legal moves of the board with the value and the distance to the end after each of them.
+
+        Returns:
+            tuple: Array of the flat indices of the moves, values of the moves for the side to move and distances.
+        """
+        flat = np.asarray(board, dtype=np.int8).ravel()
+        moves = np.flatnonzero(flat == 0)
+        children = np.repeat(flat[np.newaxis], len(moves), axis=0)
+        children[np.arange(len(moves)), moves] = side_to_move(flat[np.newaxis])[0]
+        indices = rank_boards(children.reshape(-1, self.size, self.size))
+        return moves, -self.values[indices], self.distances[indices] + 1
+
+    def best_move(self, board):
+        """
+        Returns the move of perfect play, the fastest win, a draw or the longest defence.
+
+        Returns:
+            tuple: Position of the move or None if the game is over.
+        """
+        value, distance = self.lookup(board)
+        if distance == 0:
+            return None
+        moves, values, distances = self.move_values(board)
+        move = moves[np.argmax(_score(values, distances))]
+        return divmod(int(move), self.size)
+
+    def reachable(self, indices):
+        """
+        Returns which positions can come up in a game: at most one player has a line and, if there is a line, it
+        belongs to the player who moved last and one of its stones completes all its lines.
+
+        Args:
+            indices: Array of the indices of the positions.
+
+        Returns:
+            Bool array of the shape of `indices`.
+        """
+        boards = unrank_boards(indices, self.size).reshape(len(indices), -1)
+        first_line, second_line = line_owners(boards, self.size, self.winning_length)
+        result = ~(first_line | second_line)
+
+        last_mover = -side_to_move(boards)
+        candidates = np.flatnonzero(np.where(last_mover == 1, first_line & ~second_line, second_line & ~first_line))
+        for square in range(boards.shape[1]):
+            rows = candidates[boards[candidates, square] == last_mover[candidates]]
+            previous = boards[rows]
+            previous[:, square] = 0
+            result[rows] |= ~np.any(line_owners(previous, self.size, self.winning_length), axis=0)
+        return result
+
+    def labels(self, chunk_size=1 << 16):
+        """
+        Returns all the positions which can come up in a game with their values, in the format of `game/X.npy` and
+        `game/Y.npy` used by `game/model.py`.
+
+        Returns:
+            tuple: Boards of shape (N, squares) and values for the first player of shape (N, 1).
+        """
+        boards, labels = [], []
+        for start in range(0, len(self.values), chunk_size):
+            indices = np.arange(start, min(start + chunk_size, len(self.values)))
+            indices = indices[self.reachable(indices)]
+            chunk = unrank_boards(indices, self.size).reshape(len(indices), -1)
+            boards.append(chunk)
+            labels.append((self.values[indices] * side_to_move(chunk)).astype(np.float64)[:, np.newaxis])
+        return np.concatenate(boards), np.concatenate(labels)
+
+
+if __name__ == '__main__':
+    for size, winning_length in ((3, 3), (4, 3), (4, 4)):
+        tracemalloc.start()
+        start = time.time()
+        tablebase = solve(size, winning_length)
+        elapsed = time.time() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        value, distance = tablebase.lookup(np.zeros((size, size), dtype=np.int8))
+        print("%sx%s winning length %s: %s positions, solved in %.1fs, peak memory: %.0f MB, max rss: %.0f MB, "
+              "empty board: %s in %s moves" %
+              (size, size, winning_length, len(tablebase.values), elapsed, peak / 2. ** 20,
+               resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024., {1: 'win', 0: 'draw', -1: 'loss'}[value],
+               distance))
@@ -0,0 +1,263 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from game.tic_tac_toe import apply_move_inplace, clean_board
+from players.alpha_zero import (AlphaZeroPlayer, ReplayBuffer, dihedral_symmetries, parallel_self_play, play_match,
+                                policy_value_forward, random_weights, self_play)
+from players.mcts import SearchTree, choose_move, search
+
+
+def uniform_evaluate(boards):
+    """Evaluation with uniform priors and a value of 0 for every board."""
+    return np.full(boards.shape, 1. / boards.shape[1], dtype=np.float32), np.zeros(len(boards), dtype=np.float32)
+
+
+def expanded_nodes(node):
+    yield node
+    for child in node.children.values():
+        if child.expanded:
+            yield from expanded_nodes(child)
+
+
+class TestSearch(unittest.TestCase):
+    def test_virtual_losses_are_removed(self):
+        # no game on 7x7 with 4 in a row ends within the few plies searched, so only virtual losses could add values
+        tree = SearchTree(7, 4)
+        search([tree], uniform_evaluate, simulations=64, leaves_per_tree=8)
+
+        self.assertEqual(tree.root.visits.sum(), 64)
+        self.assertEqual(tree.root.total_visits, 64)
+        for node in expanded_nodes(tree.root):
+            np.testing.assert_array_equal(node.value_sums, 0)
+            self.assertEqual(node.total_visits, node.visits.sum())
+
+    def test_search_undoes_moves(self):
+        board = clean_board(3)
+        apply_move_inplace(board, (1, 1), 1)
+        tree = SearchTree(3, 3, board, -1)
+        search([tree], uniform_evaluate, simulations=50, leaves_per_tree=4)
+
+        np.testing.assert_array_equal(tree.board, board)
+        self.assertEqual(tree.side_to_play, -1)
+
+    def test_winning_move_gets_most_visits(self):
+        board = clean_board(3)
+        for position, side in (((0, 0), 1), ((1, 0), -1), ((0, 1), 1), ((1, 1), -1)):
+            apply_move_inplace(board, position, side)
+
+        for leaves_per_tree in (1, 8):
+            tree = SearchTree(3, 3, board, 1)
+            search([tree], uniform_evaluate, simulations=200, leaves_per_tree=leaves_per_tree)
+
+            self.assertEqual(choose_move(tree), 2)
+            winning_child = int(np.flatnonzero(tree.root.moves == 2)[0])
+            self.assertGreater(tree.root.value_sums[winning_child], 0)
+
+    def test_block_gets_most_visits(self):
+        board = clean_board(3)
+        for position, side in (((0, 0), 1), ((1, 1), -1), ((2, 2), 1), ((1, 0), -1)):
+            apply_move_inplace(board, position, side)
+
+        tree = SearchTree(3, 3, board, 1)
+        search([tree], uniform_evaluate, simulations=400, leaves_per_tree=4)
+
+        self.assertEqual(choose_move(tree), 5)
+
+
+class TestDihedralSymmetries(unittest.TestCase):
+    def test_policies_follow_boards(self):
+        size = 3
+        boards = np.zeros((2, size * size), dtype=np.int8)
+        boards[0, 1] = boards[1, 5] = 1
+        boards[0, 0] = boards[1, 8] = -1
+        policies = (boards == 1).astype(np.float32)
+
+        symmetric_boards, symmetric_policies = dihedral_symmetries(boards, policies, size)
+
+        self.assertEqual(symmetric_boards.shape, (16, 9))
+        np.testing.assert_array_equal(symmetric_policies, symmetric_boards == 1)
+        self.assertEqual(len({board.tobytes() for board in symmetric_boards[0::2]}), 8)
+
+    def test_identity_comes_first(self):
+        boards = np.arange(16).reshape(1, 16)
+        symmetric_boards, symmetric_policies = dihedral_symmetries(boards, boards * 2, 4)
+
+        np.testing.assert_array_equal(symmetric_boards[0], boards[0])
+        np.testing.assert_array_equal(symmetric_policies, symmetric_boards * 2)
+
+
+class TestReplayBuffer(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    @staticmethod
+    def examples(start, count):
+        boards = np.zeros((count, 9), dtype=np.int8)
+        boards[np.arange(count), np.arange(start, start + count) % 9] = 1
+        visits = np.arange(count * 9, dtype=np.uint16).reshape(count, 9)
+        values = np.arange(start, start + count, dtype=np.int8)
+        return boards, visits, values
+
+    def test_wraparound(self):
+        buffer = ReplayBuffer(5, 9)
+        buffer.add(*self.examples(0, 3))
+        buffer.add(*self.examples(3, 4))
+
+        self.assertEqual(len(buffer), 5)
+        self.assertEqual(buffer.position, 2)
+        np.testing.assert_array_equal(buffer.values, [5, 6, 2, 3, 4])
+        np.testing.assert_array_equal(buffer.boards.argmax(axis=1), [5, 6, 2, 3, 4])
+
+    def test_save_load_round_trip(self):
+        buffer = ReplayBuffer(5, 9)
+        buffer.add(*self.examples(0, 7))
+        path = os.path.join(self.directory, 'buffer.npz')
+        buffer.save(path)
+
+        loaded = ReplayBuffer.load(path, 5)
+        self.assertEqual(len(loaded), 5)
+        np.testing.assert_array_equal(loaded.values, [2, 3, 4, 5, 6])
+        np.testing.assert_array_equal(loaded.boards.argmax(axis=1), [2, 3, 4, 5, 6])
+        np.testing.assert_array_equal(np.sort(loaded.visits, axis=0), np.sort(buffer.visits, axis=0))
+        self.assertEqual((loaded.visits.dtype, loaded.values.dtype), (np.uint16, np.int8))
+
+    def test_sample_normalizes_visits(self):
+        buffer = ReplayBuffer(5, 9)
+        buffer.add(*self.examples(0, 4))
+
+        _, policies, values = buffer.sample(16)
+        self.assertEqual((policies.dtype, values.dtype), (np.float32, np.float32))
+        np.testing.assert_allclose(policies.sum(axis=1), 1, rtol=1e-6)
+        visits = self.examples(0, 4)[1][values.astype(int)]
+        np.testing.assert_allclose(policies, visits / visits.sum(axis=1, keepdims=True), rtol=1e-6)
+
+    def test_save_load_empty(self):
+        path = os.path.join(self.directory, 'buffer.npz')
+        ReplayBuffer(5, 9).save(path)
+
+        self.assertEqual(len(ReplayBuffer.load(path, 5)), 0)
+
+    def test_load_keeps_newest_examples(self):
+        buffer = ReplayBuffer(5, 9)
+        buffer.add(*self.examples(0, 7))
+        path = os.path.join(self.directory, 'buffer.npz')
+        buffer.save(path)
+
+        np.testing.assert_array_equal(ReplayBuffer.load(path, 3).values, [4, 5, 6])
+
+
+class TestSelfPlay(unittest.TestCase):
+    def setUp(self):
+        self.weights = random_weights(9, [16], seed=0)
+        self.options = {'size': 3, 'winning_length': 3, 'simulations': 16, 'leaves_per_tree': 4}
+
+    @staticmethod
+    def split_games(boards):
+        """Splits the examples into games, every game starts from the empty board."""
+        starts = np.flatnonzero(np.count_nonzero(boards, axis=1) == 0)
+        return np.split(np.arange(len(boards)), starts[1:])
+
+    def test_policy_value_forward(self):
+        boards = np.random.RandomState(0).randint(-1, 2, (5, 9))
+        probabilities, values = policy_value_forward(self.weights, boards)
+
+        self.assertEqual((probabilities.shape, values.shape), ((5, 9), (5,)))
+        np.testing.assert_allclose(probabilities.sum(axis=1), 1, rtol=1e-6)
+        self.assertTrue(np.all(np.abs(values) < 1))
+        hidden = np.maximum(boards.dot(self.weights[0]) + self.weights[1], 0)
+        np.testing.assert_allclose(values, np.tanh(hidden.dot(self.weights[4]) + self.weights[5])[:, 0], rtol=1e-5)
+
+    def test_examples_follow_the_games(self):
+        games = 4
+        boards, visits, values = self_play(self.weights, games, seed=0, **self.options)
+
+        self.assertEqual((boards.dtype, visits.dtype, values.dtype), (np.int8, np.uint16, np.int8))
+        self.assertTrue(np.all(visits.sum(axis=1) >= self.options['simulations']))
+        game_examples = self.split_games(boards)
+        self.assertEqual(len(game_examples), games)
+
+        for examples in game_examples:
+            # one example per move played, the board before the move seen from the side to play
+            np.testing.assert_array_equal(np.count_nonzero(boards[examples], axis=1), np.arange(len(examples)))
+            for before, after in zip(examples[:-1], examples[1:]):
+                move = np.flatnonzero(-boards[after] - boards[before])
+                self.assertEqual(len(move), 1)
+                self.assertGreater(visits[before, move[0]], 0)
+
+            # values are the winner times the side to play, so the side of the last move scores 1 unless it is a draw
+            winner_for_first_player = values[examples[0]]
+            sides = np.where(np.arange(len(examples)) % 2 == 0, 1, -1)
+            np.testing.assert_array_equal(values[examples], winner_for_first_player * sides)
+            if values[examples[-1]] == 0:
+                self.assertEqual(len(examples), 9)
+            else:
+                self.assertEqual(values[examples[-1]], 1)
+
+    def test_play_match_score(self):
+        games = 4
+        score = play_match(self.weights, self.weights, games, **self.options)
+
+        self.assertTrue(0 <= score <= 1)
+        self.assertEqual(score * 2 * games, round(score * 2 * games))
+
+    def test_parallel_self_play_round_trip(self):
+        seed, workers = 3, 2
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+            boards, visits, values = parallel_self_play(pool, self.weights, 5, workers, seed=seed, **self.options)
+
+        chunks = [self_play(self.weights, games, seed=seed * workers + worker, **self.options)
+                  for worker, games in enumerate((3, 2))]
+        for examples, expected in zip((boards, visits, values), zip(*chunks)):
+            np.testing.assert_array_equal(examples, np.concatenate(expected))
+        self.assertEqual(boards.dtype, np.int8)
+        self.assertEqual(len(self.split_games(boards)), 5)
+
+
+class TestAlphaZeroPlayer(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        self.player = AlphaZeroPlayer(1, random_weights(9, [16], seed=0), 3, 3, simulations=100, leaves_per_tree=4)
+
+    def test_tree_is_reused_after_opponent_move(self):
+        board = clean_board(3)
+        move = self.player.get_move(board, 1)
+        apply_move_inplace(board, move, 1)
+
+        tree = self.player.tree
+        opponent_move = choose_move(tree)
+        expected_root = tree.root.children[int(np.flatnonzero(tree.root.moves == opponent_move)[0])]
+        apply_move_inplace(board, divmod(opponent_move, 3), -1)
+
+        synced = self.player._sync_tree(board, 1)
+        self.assertIs(synced, tree)
+        self.assertIs(synced.root, expected_root)
+        np.testing.assert_array_equal(synced.board, board)
+
+    def test_tree_is_rebuilt_for_unrelated_board(self):
+        board = clean_board(3)
+        apply_move_inplace(board, self.player.get_move(board, 1), 1)
+        tree = self.player.tree
+
+        other = clean_board(3)
+        apply_move_inplace(other, (0, 0), 1)
+        apply_move_inplace(other, (2, 2), -1)
+        if np.array_equal(other != 0, board != 0):
+            apply_move_inplace(other, (0, 1), 1)
+            apply_move_inplace(other, (2, 1), -1)
+
+        synced = self.player._sync_tree(other, 1)
+        self.assertIsNot(synced, tree)
+        self.assertFalse(synced.root.expanded)
+        np.testing.assert_array_equal(synced.board, other)
+
+
+if __name__ == '__main__':
+    unittest.main()
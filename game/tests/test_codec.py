@@ -0,0 +1,94 @@
+import numpy as np
+import unittest
+
+from game.codec import decode_base3, encode_base3, pack_board, pack_boards, rank_boards, state_count, \
+    stone_count_offsets, unpack_board, unpack_boards, unrank_boards
+from game.tic_tac_toe import apply_move_inplace, clean_board
+
+
+class TestCodec(unittest.TestCase):
+    def setUp(self):
+        self.random_state = np.random.RandomState(0)
+
+    def test_pack_boards_round_trip(self):
+        for size in (3, 4, 15):
+            boards = self.random_state.randint(-1, 2, (100, size, size))
+            packed = pack_boards(boards)
+
+            self.assertEqual(packed.shape, (100, (size * size + 3) // 4))
+            self.assertEqual(packed.dtype, np.uint8)
+            np.testing.assert_array_equal(unpack_boards(packed, size), boards)
+
+    def test_empty_batch(self):
+        for size in (3, 5):
+            boards = np.zeros((0, size, size), dtype=np.int8)
+            packed = pack_boards(boards)
+
+            self.assertEqual(packed.shape, (0, (size * size + 3) // 4))
+            self.assertEqual(pack_boards(boards.reshape(0, size * size)).shape, packed.shape)
+            self.assertEqual(unpack_boards(packed, size).shape, (0, size, size))
+            self.assertEqual(encode_base3(boards).shape, (0,))
+            self.assertEqual(rank_boards(boards).shape, (0,))
+
+    def test_pack_board_round_trip(self):
+        board = clean_board(3)
+        apply_move_inplace(board, (0, 0), 1)
+        apply_move_inplace(board, (2, 1), -1)
+        data = pack_board(board)
+
+        self.assertEqual(len(data), 3)
+        np.testing.assert_array_equal(unpack_board(data, 3), board)
+
+    def test_base3_round_trip(self):
+        boards = self.random_state.randint(-1, 2, (100, 4, 4))
+        codes = encode_base3(boards)
+
+        self.assertEqual(codes.shape, (100,))
+        np.testing.assert_array_equal(decode_base3(codes, 4), boards)
+
+    def test_base3_of_single_board(self):
+        board = clean_board(3)
+        apply_move_inplace(board, (0, 1), -1)
+
+        self.assertEqual(encode_base3(board), 6)
+
+    def test_state_count(self):
+        self.assertEqual(state_count(3), 6046)
+        self.assertEqual(stone_count_offsets(3)[1], 1)
+        self.assertEqual(stone_count_offsets(3)[2], 10)
+
+    def test_rank_is_perfect_on_3x3(self):
+        indices = np.arange(state_count(3))
+        boards = unrank_boards(indices, 3)
+        np.testing.assert_array_equal(rank_boards(boards), indices)
+
+        differences = (boards == 1).sum(axis=(1, 2)) - (boards == -1).sum(axis=(1, 2))
+        self.assertTrue(np.all((differences == 0) | (differences == 1)))
+        self.assertEqual(len(np.unique(encode_base3(boards))), state_count(3))
+
+    def test_rank_round_trip_on_4x4(self):
+        indices = self.random_state.randint(0, state_count(4), 1000)
+        np.testing.assert_array_equal(rank_boards(unrank_boards(indices, 4)), indices)
+
+    def test_rank_of_illegal_board(self):
+        board = clean_board(3)
+        apply_move_inplace(board, (0, 0), -1)
+
+        self.assertRaises(ValueError, rank_boards, board[np.newaxis])
+
+    def test_rank_round_trip_on_6x6(self):
+        boards = unrank_boards(self.random_state.randint(0, state_count(6), 1000), 6)
+
+        self.assertGreater(state_count(6), 0)
+        np.testing.assert_array_equal(unrank_boards(rank_boards(boards), 6), boards)
+
+    def test_indices_overflowing_64_bits(self):
+        boards = np.zeros((1, 7, 7), dtype=np.int8)
+
+        self.assertRaises(ValueError, state_count, 7)
+        self.assertRaises(ValueError, rank_boards, boards)
+        self.assertRaises(ValueError, unrank_boards, [0], 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
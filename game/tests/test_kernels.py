@@ -0,0 +1,65 @@
+import numpy as np
+import unittest
+from unittest import mock
+
+from game import kernels, tic_tac_toe
+
+
+class TestKernels(unittest.TestCase):
+    def setUp(self):
+        self.random_state = np.random.RandomState(0)
+
+    def random_boards(self, shape, count):
+        boards = self.random_state.randint(-1, 2, (count,) + shape)
+        boards[self.random_state.rand(count, *shape) < self.random_state.rand(count, 1, 1)] = 0
+        return boards
+
+    def test_line_parity(self):
+        for length, winning_length in ((3, 3), (7, 4), (15, 5)):
+            for line in self.random_boards((1, length), 500)[:, 0]:
+                self.assertEqual(kernels.determine_line_winner(line, winning_length),
+                                 tic_tac_toe.determine_line_winner(line.tolist(), winning_length))
+                self.assertEqual(kernels.evaluate_line(line, winning_length),
+                                 tic_tac_toe._evaluate_line(line.tolist(), winning_length))
+
+    def test_board_winner_parity(self):
+        for shape, winning_length in (((3, 3), 3), ((4, 4), 3), ((5, 5), 4), ((7, 7), 4), ((15, 15), 5), ((4, 6), 3)):
+            boards = self.random_boards(shape, 300)
+            winners = [kernels.determine_board_winner(board, winning_length) for board in boards]
+
+            self.assertEqual(winners, [tic_tac_toe.determine_board_winner(board, winning_length) for board in boards])
+            self.assertTrue(1 in winners and -1 in winners)
+
+    def test_evaluate_parity(self):
+        for size, winning_length in ((3, 3), (4, 3), (5, 4), (7, 4), (15, 5)):
+            for board in self.random_boards((size, size), 300):
+                self.assertEqual(kernels.evaluate(board, winning_length), tic_tac_toe.evaluate(board, winning_length))
+
+    def test_int8_boards(self):
+        board = tic_tac_toe.clean_board(3).astype(np.int8)
+        for position in ((0, 0), (1, 1), (2, 2)):
+            tic_tac_toe.apply_move_inplace(board, position, -1)
+
+        self.assertEqual(kernels.determine_board_winner(board, 3), -1)
+        self.assertEqual(kernels.evaluate(board, 3), tic_tac_toe.evaluate(board, 3))
+
+    def test_falls_back_without_numba(self):
+        board = tic_tac_toe.clean_board(3)
+        tic_tac_toe.apply_move_inplace(board, (0, 2), 1)
+        tic_tac_toe.apply_move_inplace(board, (1, 1), 1)
+        tic_tac_toe.apply_move_inplace(board, (2, 0), 1)
+
+        with mock.patch.object(kernels, '_loaded', False), mock.patch.object(kernels, '_jit', None), \
+                mock.patch('importlib.import_module', side_effect=ImportError):
+            self.assertFalse(kernels.jit_available())
+            self.assertEqual(kernels.determine_board_winner(board, 3), 1)
+            self.assertEqual(kernels.evaluate(board, 3), tic_tac_toe.evaluate(board, 3))
+
+    @unittest.skipUnless(kernels.jit_available(), "numba is not installed")
+    def test_kernels_are_compiled(self):
+        self.assertGreater(kernels.warm_up(), 0)
+        self.assertTrue(kernels._kernels().determine_board_winner.signatures)
+
+
+if __name__ == '__main__':
+    unittest.main()
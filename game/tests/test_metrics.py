@@ -0,0 +1,153 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from utils.metrics import CsvSink, JsonlSink, MetricsLogger, histogram_buckets, result_rates
+
+
+class RecordingSink:
+    """Sink keeping every batch of records it receives in memory."""
+
+    def __init__(self, delay=0.):
+        self.delay = delay
+        self.batches = []
+        self.closed = False
+        self.written = threading.Event()
+
+    def write(self, records):
+        time.sleep(self.delay)
+        self.batches.append(list(records))
+        self.written.set()
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    @property
+    def records(self):
+        return [record for batch in self.batches for record in batch]
+
+
+class TestMetricsLogger(unittest.TestCase):
+    def test_buffers_until_flush_every(self):
+        sink = RecordingSink()
+        logger = MetricsLogger([sink], flush_every=3, flush_secs=60.)
+
+        logger.scalar('loss', 1., 1)
+        logger.scalar('loss', 2., 2)
+        self.assertEqual(len(logger._buffer), 2)
+        self.assertFalse(sink.written.wait(0.1))
+
+        logger.scalar('loss', 3., 3)
+        self.assertEqual(logger._buffer, [])
+        self.assertTrue(sink.written.wait(5))
+        self.assertEqual([(tag, value, step) for _, tag, value, step, _ in sink.records],
+                         [('loss', 1., 1), ('loss', 2., 2), ('loss', 3., 3)])
+        logger.close()
+
+    def test_flushes_after_flush_secs(self):
+        sink = RecordingSink()
+        with mock.patch('utils.metrics.time') as clock:
+            clock.time.return_value = 100.
+            logger = MetricsLogger([sink], flush_every=1000, flush_secs=10.)
+
+            clock.time.return_value = 105.
+            logger.scalar('loss', 1., 1)
+            self.assertEqual(len(logger._buffer), 1)
+
+            clock.time.return_value = 110.
+            logger.histogram('values', [1, 2, 3], 2)
+            self.assertEqual(logger._buffer, [])
+
+        self.assertTrue(sink.written.wait(5))
+        self.assertEqual(len(sink.batches[0]), 2)
+        self.assertEqual(sink.batches[0][1][3], 2)
+        np.testing.assert_array_equal(sink.batches[0][1][2], [1., 2., 3.])
+        logger.close()
+
+    def test_close_drains_queue(self):
+        sink = RecordingSink(delay=0.02)
+        logger = MetricsLogger([sink], flush_every=2, flush_secs=60.)
+
+        for step in range(21):
+            logger.scalar('loss', step, step)
+        logger.close()
+
+        self.assertEqual([record[3] for record in sink.records], list(range(21)))
+        self.assertEqual(len(sink.batches), 11)
+        self.assertTrue(sink.closed)
+        self.assertFalse(logger._thread.is_alive())
+
+
+class TestSinks(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.records = [('scalar', 'results/win_rate', 0.5, 10, 1.),
+                        ('histogram', 'rewards', np.array([1., 2., 3., 6.]), 10, 2.),
+                        ('histogram', 'empty', np.zeros(0), 10, 3.)]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_csv_sink(self):
+        path = os.path.join(self.directory, 'metrics.csv')
+        for _ in range(2):
+            sink = CsvSink(path)
+            sink.write(self.records)
+            sink.close()
+
+        with open(path, newline='') as csv_file:
+            rows = list(csv.reader(csv_file))
+
+        self.assertEqual(rows[0], ['wall_time', 'step', 'tag', 'value'])
+        self.assertEqual(len(rows), 1 + 2 * 5)
+        self.assertEqual(rows[1], ['1.0', '10', 'results/win_rate', '0.5'])
+        self.assertEqual({row[2]: float(row[3]) for row in rows[2:6]},
+                         {'rewards/mean': 3., 'rewards/std': np.std([1., 2., 3., 6.]), 'rewards/min': 1.,
+                          'rewards/max': 6.})
+
+    def test_jsonl_sink(self):
+        path = os.path.join(self.directory, 'metrics.jsonl')
+        sink = JsonlSink(path, bins=5)
+        sink.write(self.records)
+        sink.close()
+
+        with open(path) as jsonl_file:
+            records = [json.loads(line) for line in jsonl_file]
+
+        self.assertEqual(records[0], {'wall_time': 1., 'step': 10, 'tag': 'results/win_rate', 'kind': 'scalar',
+                                      'value': 0.5})
+        self.assertEqual(records[1]['counts'], [1, 1, 1, 0, 1])
+        np.testing.assert_allclose(records[1]['edges'], [1., 2., 3., 4., 5., 6.])
+        self.assertEqual((records[2]['counts'], records[2]['edges']), ([], [0.]))
+
+
+class TestHelpers(unittest.TestCase):
+    def test_histogram_buckets(self):
+        counts, edges = histogram_buckets(np.array([0., 0.5, 1., 1.]), bins=2)
+
+        np.testing.assert_array_equal(counts, [1, 3])
+        np.testing.assert_array_equal(edges, [0., 0.5, 1.])
+
+    def test_histogram_buckets_empty(self):
+        counts, edges = histogram_buckets(np.zeros(0))
+
+        self.assertEqual((counts.size, edges.size), (0, 1))
+
+    def test_result_rates(self):
+        self.assertEqual(result_rates([1, 1, 0, -1]), (0.5, 0.25, 0.25))
+        self.assertEqual(result_rates([]), (0., 0., 0.))
+
+
+if __name__ == '__main__':
+    unittest.main()
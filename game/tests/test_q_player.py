@@ -0,0 +1,89 @@
+import os
+import pickle
+import random
+import unittest
+
+import numpy as np
+
+from game.tic_tac_toe import apply_move, available_moves, clean_board, determine_board_winner, hash_board, unhash_board
+from players import QPlayer as q_player_module
+from players.QPlayer import QPlayer, train_q_player
+from players.random_player import RandomPlayer
+
+
+class _MainUnpickler(pickle.Unpickler):
+    """qlr.pkl was pickled by running players/QPlayer.py as a script, so its class is __main__.QPlayer."""
+
+    def find_class(self, module, name):
+        if module == '__main__':
+            return getattr(q_player_module, name)
+        return super().find_class(module, name)
+
+
+def winning_reply(board, side):
+    return next(move for move in available_moves(board) if determine_board_winner(apply_move(board, move, side), 3))
+
+
+class TestQPlayer(unittest.TestCase):
+    def setUp(self):
+        # X to move, O threatens column 1 once it plays (0, 1)
+        self.board = clean_board(3)
+        self.board[0, 0] = self.board[2, 0] = 1
+        self.board[1, 0] = self.board[1, 1] = -1
+        # X plays (0, 2) and O replies (0, 1), after that O threatens both (1, 2) and (2, 1)
+        self.next_board = apply_move(apply_move(self.board, (0, 2), 1), (0, 1), -1)
+
+    def test_learn_q_loss_reward(self):
+        qplayer = QPlayer(1, 3, learning_rate=0.5)
+        move = (2, 2)
+        after_move = apply_move(self.next_board, move, 1)
+        lost_board = apply_move(after_move, winning_reply(after_move, -1), -1)
+
+        self.assertAlmostEqual(qplayer.learn_q(self.next_board, move, lost_board), 0.5 * (-1 - 1.0))
+
+    def test_learn_q_win_reward(self):
+        board = clean_board(3)
+        board[0, 0] = board[0, 1] = 1
+        board[1, 0] = board[1, 1] = -1
+        qplayer = QPlayer(1, 3, learning_rate=0.5)
+
+        self.assertAlmostEqual(qplayer.learn_q(board, (0, 2), apply_move(board, (0, 2), 1)), 0.5 * (1 - 1.0))
+
+    def test_loss_propagates_back(self):
+        for discount in (0.5, 0.9):
+            qplayer = QPlayer(1, 3, learning_rate=0.5, discount=discount)
+            for _ in range(30):
+                for move in available_moves(self.next_board):
+                    after_move = apply_move(self.next_board, move, 1)
+                    qplayer.learn_q(self.next_board, move, apply_move(after_move, winning_reply(after_move, -1), -1))
+                qplayer.learn_q(self.board, (0, 2), self.next_board)
+
+            for value in qplayer.q_table[hash_board(self.next_board)].values():
+                self.assertAlmostEqual(value, -1.0)
+            self.assertAlmostEqual(qplayer.q_table[hash_board(self.board)][(0, 2)], -discount, places=5)
+            self.assertNotEqual(qplayer.get_move(self.board), (0, 2))
+
+    def test_training_learns_boards_with_q_player_to_move(self):
+        random.seed(0)
+        qplayer = QPlayer(1, 3)
+        train_q_player(qplayer, RandomPlayer(-1), 300, 3)
+
+        for board_hash in qplayer.q_table:
+            board = unhash_board(board_hash, 3)
+            self.assertEqual(np.sum(board == 1), np.sum(board == -1))
+        moved_from = [values for values in qplayer.q_table.values() if any(value != 1.0 for value in values.values())]
+        self.assertGreater(len(moved_from), len(qplayer.q_table) // 2)
+
+    def test_learn_q_on_old_pickle(self):
+        path = os.path.join(os.path.dirname(q_player_module.__file__), 'qlr.pkl')
+        with open(path, 'rb') as handle:
+            qplayer = _MainUnpickler(handle).load()
+
+        self.assertNotIn('discount', vars(qplayer))
+        self.assertEqual((qplayer.learning_rate, qplayer.discount), (0.3, 0.9))
+        board = clean_board(3)
+        qplayer.learn_q(board, qplayer.get_move(board), apply_move(board, (2, 2), -1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+import json
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from game.tic_tac_toe import apply_move, available_moves, clean_board, determine_board_winner, hash_board
+from players.QPlayer import ArrayQPlayer, QPlayer, train_q_player
+from players.mlp_player import mlp_forward
+from players.random_player import RandomPlayer
+from utils.shared_arrays import SharedArrayStore, SharedArrayView
+
+MODEL_JSON = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'players', 'model.json')
+
+
+class TestSharedArrays(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = SharedArrayStore('weights', self.directory)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def test_nothing_published(self):
+        view = SharedArrayView('weights', self.directory)
+
+        self.assertIsNone(view.arrays)
+        self.assertFalse(view.refresh())
+
+    def test_publish_and_attach(self):
+        arrays = [np.arange(6, dtype=np.float32).reshape(2, 3), np.ones(4)]
+        self.assertEqual(self.store.publish(arrays), 1)
+
+        view = SharedArrayView('weights', self.directory)
+        self.assertEqual(view.version, 1)
+        for attached, array in zip(view.arrays, arrays):
+            self.assertIsInstance(attached, np.memmap)
+            self.assertFalse(attached.flags.writeable)
+            np.testing.assert_array_equal(attached, array)
+
+    def test_publish_is_atomic(self):
+        self.store.publish([np.zeros(3)])
+
+        entries = sorted(os.listdir(self.store.path))
+        self.assertEqual(entries, ['1', 'version'])
+        with open(os.path.join(self.store.path, '1', 'manifest.json')) as manifest:
+            self.assertEqual(json.load(manifest), {'arrays': 1})
+
+    def test_refresh_swaps_to_new_version(self):
+        self.store.publish([np.zeros(3)])
+        view = SharedArrayView('weights', self.directory)
+        old_arrays = view.arrays
+
+        self.assertFalse(view.refresh())
+        self.store.publish([np.full(3, 2.)])
+        self.store.publish([np.full(3, 3.)])
+
+        self.assertFalse(os.path.exists(os.path.join(self.store.path, '1')))
+        self.assertTrue(view.refresh())
+        self.assertEqual(view.version, 3)
+        np.testing.assert_array_equal(view.arrays[0], 3.)
+        # the removed version stays mapped for the readers still holding it
+        np.testing.assert_array_equal(old_arrays[0], 0.)
+
+    def test_refresh_retries_when_version_is_removed_while_attaching(self):
+        self.store.publish([np.zeros(3)])
+        view = SharedArrayView('weights', self.directory)
+        self.store.publish([np.ones(3)])
+
+        attach = view._attach
+        calls = []
+
+        def attach_after_newer_versions(version):
+            if not calls:
+                self.store.publish([np.full(3, 2.)])
+                self.store.publish([np.full(3, 3.)])
+            calls.append(version)
+            return attach(version)
+
+        with mock.patch.object(view, '_attach', side_effect=attach_after_newer_versions):
+            self.assertTrue(view.refresh())
+
+        self.assertEqual(calls, [2, 4])
+        self.assertEqual(view.version, 4)
+        np.testing.assert_array_equal(view.arrays[0], 3.)
+
+    def test_close_removes_store(self):
+        self.store.publish([np.zeros(3)])
+        self.store.close()
+
+        self.assertFalse(os.path.exists(self.store.path))
+
+
+class TestArrayQPlayer(unittest.TestCase):
+    def test_moves_match_q_player(self):
+        random.seed(0)
+        qplayer = QPlayer(1, 3)
+        train_q_player(qplayer, RandomPlayer(-1), 300, 3)
+        array_player = ArrayQPlayer(1, qplayer.to_array(3))
+
+        random.seed(1)
+        for _ in range(50):
+            board = clean_board(3)
+            while determine_board_winner(board, 3) == 0 and available_moves(board):
+                if np.sum(board) == 0:
+                    move = qplayer.get_move(board)
+                    self.assertEqual(array_player.get_move(board), move, hash_board(board))
+                    board = apply_move(board, move, 1)
+                else:
+                    board = apply_move(board, random.choice(available_moves(board)), -1)
+
+    def test_unknown_board_plays_first_legal_move(self):
+        board = clean_board(3)
+        board[0, 0], board[0, 1] = -1, -1
+        board[1, 1] = 1
+        board[2, 2] = 1
+
+        self.assertEqual(ArrayQPlayer(1, QPlayer(1, 3).to_array(3)).get_move(board), (0, 2))
+
+
+class TestMlpForward(unittest.TestCase):
+    def keras_layout_weights(self):
+        """Random weights in the order of `model.get_weights()` for the dense layers of players/model.json."""
+        with open(MODEL_JSON) as model_file:
+            layers = [layer['config'] for layer in json.load(model_file)['config'] if layer['class_name'] == 'Dense']
+
+        random_state = np.random.RandomState(0)
+        weights, inputs = [], 9
+        for layer in layers:
+            weights.append(random_state.randn(inputs, layer['units']).astype(np.float32))
+            weights.append(random_state.randn(layer['units']).astype(np.float32))
+            inputs = layer['units']
+        return layers, weights
+
+    def test_matches_dense_layers(self):
+        layers, weights = self.keras_layout_weights()
+        boards = np.random.RandomState(1).randint(-1, 2, (20, 9))
+
+        expected = boards.astype(np.float32)
+        for layer, kernel, bias in zip(layers, weights[::2], weights[1::2]):
+            expected = expected.dot(kernel) + bias
+            if layer['activation'] == 'relu':
+                expected = np.maximum(expected, 0)
+            else:
+                self.assertEqual(layer['activation'], 'linear')
+
+        np.testing.assert_allclose(mlp_forward(weights, boards), expected, rtol=1e-5)
+
+    def test_matches_keras_predict(self):
+        try:
+            from keras.models import model_from_json
+        except ImportError:
+            self.skipTest("keras is not installed")
+
+        with open(MODEL_JSON) as model_file:
+            model = model_from_json(model_file.read())
+        _, weights = self.keras_layout_weights()
+        model.set_weights(weights)
+        boards = np.random.RandomState(1).randint(-1, 2, (20, 9))
+
+        np.testing.assert_allclose(mlp_forward(weights, boards), model.predict(boards), rtol=1e-4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import unittest
+
+from utils.sweep import THREAD_VARIABLES, MedianStoppingRule, grid_search, random_search, run_sweep
+
+
+def startup_environment():
+    """Returns the environment the process was started with, numpy reads its thread limits while it is imported."""
+    with open('/proc/self/environ', 'rb') as environ:
+        return dict(entry.decode().split('=', 1) for entry in environ.read().split(b'\0') if entry)
+
+
+def environment_trial(config, callback, threads):
+    """Reports whether the worker started with the thread limits, fails when asked to."""
+    if config['fail']:
+        raise ValueError('broken config')
+    environment = startup_environment() if os.path.exists('/proc/self/environ') else os.environ
+    for episode in range(1, 4):
+        callback(episode * 10, float(all(environment.get(variable) == str(threads) for variable in THREAD_VARIABLES)))
+
+
+class TestSearch(unittest.TestCase):
+    def test_grid_search(self):
+        configs = grid_search({'learning_rate': [0.1, 0.3], 'discount': [0.5, 0.9, 0.99]})
+
+        self.assertEqual(len(configs), 6)
+        self.assertEqual(configs[0], {'discount': 0.5, 'learning_rate': 0.1})
+        self.assertEqual(len({tuple(sorted(config.items())) for config in configs}), 6)
+
+    def test_random_search(self):
+        space = {'learning_rate': (1e-4, 1e-1), 'batch_size': (10, 20), 'layers': [[9, 9], [9, 100, 9]]}
+        configs = random_search(space, 50, seed=1)
+
+        self.assertEqual(len(configs), 50)
+        self.assertEqual(configs, random_search(space, 50, seed=1))
+        self.assertNotEqual(configs, random_search(space, 50, seed=2))
+        for config in configs:
+            self.assertTrue(1e-4 <= config['learning_rate'] <= 1e-1)
+            self.assertIsInstance(config['batch_size'], int)
+            self.assertTrue(10 <= config['batch_size'] <= 20)
+            self.assertIn(config['layers'], space['layers'])
+        # log-uniform sampling puts about a third of the values into every decade
+        self.assertTrue(5 < sum(config['learning_rate'] < 1e-3 for config in configs) < 30)
+
+
+class TestMedianStoppingRule(unittest.TestCase):
+    def setUp(self):
+        self.reports = {other: [(10, 0.5), (20, 0.6)] for other in ('a', 'b', 'c')}
+
+    def test_stops_below_median(self):
+        rule = MedianStoppingRule(self.reports, min_trials=3)
+
+        self.assertFalse(rule.should_stop('d', 10, 0.5))
+        self.assertTrue(rule.should_stop('d', 20, 0.4))
+        self.assertEqual(self.reports['d'], [(10, 0.5), (20, 0.4)])
+
+    def test_grace_episodes(self):
+        rule = MedianStoppingRule(self.reports, grace_episodes=20, min_trials=3)
+
+        self.assertFalse(rule.should_stop('d', 10, 0.))
+        self.assertTrue(rule.should_stop('d', 20, 0.))
+
+    def test_min_trials(self):
+        rule = MedianStoppingRule(self.reports, min_trials=4)
+        self.assertFalse(rule.should_stop('d', 10, 0.))
+
+        # trials which have not reached the episode do not count
+        self.reports['e'] = [(10, 0.5)]
+        rule = MedianStoppingRule(self.reports, min_trials=4)
+        self.assertFalse(rule.should_stop('d', 20, 0.))
+
+
+class TestRunSweep(unittest.TestCase):
+    def test_results_and_thread_limits(self):
+        results = run_sweep(environment_trial, grid_search({'fail': [False, True]}), early_stopping=False)
+
+        self.assertEqual([result['fail'] for result in results], [False, True])
+        self.assertEqual((results[0]['win_rate'], results[0]['episodes'], results[0]['error']), (1., 30, ''))
+        self.assertEqual(results[1]['episodes'], 0)
+        self.assertEqual(results[1]['error'], 'ValueError: broken config')
+        for variable in THREAD_VARIABLES:
+            self.assertNotEqual(os.environ.get(variable), '1')
+
+
+if __name__ == '__main__':
+    unittest.main()
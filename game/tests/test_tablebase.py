@@ -0,0 +1,117 @@
+import random
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from game.codec import rank_boards, state_count
+from game.tablebase import Tablebase, line_owners, side_to_move, solve
+from game.tic_tac_toe import GameState, apply_move_inplace, clean_board, hash_board
+from players.random_player import RandomPlayer
+from players.tablebase_player import TablebasePlayer
+
+
+def negamax(state, table):
+    """Returns the value for the side to play and the distance to the end, memoized by board in `table`."""
+    key = hash_board(state.board)
+    if key in table:
+        return table[key]
+
+    if state.winner != 0:
+        result = (-1, 0)
+    elif state.empty_count == 0:
+        result = (0, 0)
+    else:
+        children = []
+        for move in list(state.legal_moves):
+            state.play(move)
+            value, distance = negamax(state, table)
+            state.undo()
+            children.append((-value, distance + 1))
+        value = max(child_value for child_value, _ in children)
+        distances = [distance for child_value, distance in children if child_value == value]
+        result = (value, min(distances) if value == 1 else max(distances))
+
+    table[key] = result
+    return result
+
+
+class TestTablebase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.tablebase = solve(3, 3, cls.directory, chunk_size=1000)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def test_empty_batch(self):
+        boards = np.zeros((0, 3, 3), dtype=np.int8)
+        first, second = line_owners(boards, 3, 3)
+
+        self.assertEqual((first.shape, second.shape), ((0,), (0,)))
+        self.assertEqual(side_to_move(boards).shape, (0,))
+
+    def test_empty_board_is_draw(self):
+        self.assertEqual(self.tablebase.lookup(clean_board(3)), (0, 9))
+
+    def test_matches_negamax(self):
+        table = {}
+        negamax(GameState(3, 3), table)
+
+        self.assertEqual(len(table), 5478)
+        for key, expected in table.items():
+            board = np.array([int(cell) for cell in key.replace('-1', '2')]).reshape(3, 3)
+            board[board == 2] = -1
+            self.assertEqual(self.tablebase.lookup(board), expected)
+
+    def test_load_is_memory_mapped(self):
+        tablebase = Tablebase.load_or_solve(3, 3, self.directory)
+
+        self.assertIsInstance(tablebase.values, np.memmap)
+        self.assertEqual(len(tablebase.values), state_count(3))
+        np.testing.assert_array_equal(tablebase.distances, self.tablebase.distances)
+
+    def test_best_move_wins_fastest(self):
+        board = clean_board(3)
+        for position, side in (((0, 0), 1), ((1, 0), -1), ((0, 1), 1), ((1, 1), -1)):
+            apply_move_inplace(board, position, side)
+
+        self.assertEqual(self.tablebase.lookup(board), (1, 1))
+        self.assertEqual(self.tablebase.best_move(board), (0, 2))
+
+    def test_best_move_of_finished_game(self):
+        board = clean_board(3)
+        for position, side in (((0, 0), 1), ((1, 0), -1), ((0, 1), 1), ((1, 1), -1), ((0, 2), 1)):
+            apply_move_inplace(board, position, side)
+
+        self.assertIsNone(self.tablebase.best_move(board))
+
+    def test_labels_cover_reachable_positions(self):
+        boards, labels = self.tablebase.labels()
+
+        self.assertEqual(boards.shape, (5478, 9))
+        self.assertEqual(labels.shape, (5478, 1))
+        first_line, second_line = line_owners(boards, 3, 3)
+        self.assertFalse(np.any(first_line & second_line))
+        np.testing.assert_array_equal(labels[first_line, 0], 1)
+        np.testing.assert_array_equal(labels[second_line, 0], -1)
+        np.testing.assert_array_equal(self.tablebase.reachable(rank_boards(boards.reshape(-1, 3, 3))), True)
+
+    def test_perfect_player_never_loses(self):
+        random.seed(0)
+        for perfect_side in (1, -1):
+            for _ in range(50):
+                players = {perfect_side: TablebasePlayer(perfect_side, self.tablebase),
+                           -perfect_side: RandomPlayer(-perfect_side)}
+                state = GameState(3, 3)
+                while not state.finished:
+                    state.play(players[state.side_to_play].get_move(state.board, state.side_to_play))
+
+                self.assertNotEqual(state.winner, -perfect_side)
+
+
+if __name__ == '__main__':
+    unittest.main()
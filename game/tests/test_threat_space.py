@@ -0,0 +1,124 @@
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from game.codec import stone_count_offsets, unrank_boards
+from game.tablebase import line_owners, side_to_move, solve
+from game.threat_space import ThreatSpaceSearch, forced_win_move, line_windows
+from game.tic_tac_toe import apply_move_inplace, clean_board
+
+
+class TestThreatSpace(unittest.TestCase):
+    def test_line_windows_count(self):
+        self.assertEqual(len(line_windows(3, 3)), 8)
+        self.assertEqual(len(line_windows(4, 3)), 24)
+        self.assertEqual(line_windows(15, 5).shape, (572, 5))
+
+    def test_line_windows_are_lines(self):
+        size = 5
+        for window in line_windows(size, 3):
+            rows, columns = np.divmod(window, size)
+            row_steps, column_steps = set(np.diff(rows)), set(np.diff(columns))
+
+            self.assertEqual(len(row_steps), 1)
+            self.assertEqual(len(column_steps), 1)
+            self.assertNotEqual((row_steps.pop(), column_steps.pop()), (0, 0))
+
+    def test_immediate_win(self):
+        board = clean_board(15)
+        for column in range(3, 7):
+            apply_move_inplace(board, (7, column), 1)
+        apply_move_inplace(board, (7, 2), -1)
+
+        self.assertEqual(forced_win_move(board, 1, 5), (7, 7))
+
+    def test_no_forced_win_on_empty_board(self):
+        board = clean_board(15)
+
+        self.assertIsNone(forced_win_move(board, 1, 5))
+
+    def test_double_four(self):
+        # (7, 7) completes a four in the row and another in the column, no single move wins at once
+        board = clean_board(15)
+        for position in ((7, 4), (7, 5), (7, 6), (4, 7), (5, 7), (6, 7)):
+            apply_move_inplace(board, position, 1)
+        for position in ((7, 3), (3, 7), (0, 0)):
+            apply_move_inplace(board, position, -1)
+        search = ThreatSpaceSearch(15, 5)
+
+        self.assertEqual(search.solve(board, 1), (7, 7))
+        self.assertGreater(search.nodes, 1)
+
+        apply_move_inplace(board, (8, 7), -1)
+        self.assertIsNone(search.solve(board, 1))
+
+    def test_defender_block_refutes_single_four(self):
+        board = clean_board(15)
+        for column in range(4, 7):
+            apply_move_inplace(board, (7, column), 1)
+        apply_move_inplace(board, (7, 3), -1)
+
+        self.assertIsNone(forced_win_move(board, 1, 5))
+
+    def test_open_three_wins_with_an_open_four(self):
+        board = clean_board(15)
+        for column in range(5, 8):
+            apply_move_inplace(board, (7, column), 1)
+        apply_move_inplace(board, (0, 0), -1)
+        apply_move_inplace(board, (0, 14), -1)
+
+        self.assertIsNotNone(forced_win_move(board, 1, 5))
+
+    def test_threes_extend_the_search(self):
+        board = np.array([[0, 0, 0, 0, 1],
+                          [1, 0, 1, 0, 0],
+                          [-1, 0, 0, 0, 0],
+                          [0, 0, 0, -1, 0],
+                          [0, -1, 0, 0, 0]])
+
+        self.assertIsNone(ThreatSpaceSearch(5, 4).solve(board, 1))
+        self.assertIsNotNone(ThreatSpaceSearch(5, 4, threes=True).solve(board, 1))
+
+
+class TestThreatSpaceSoundness(unittest.TestCase):
+    """Every move found by the search has to be a win according to the tablebase of the game."""
+
+    def assert_found_moves_win(self, size, winning_length, positions, min_found):
+        directory = tempfile.mkdtemp()
+        try:
+            tablebase = solve(size, winning_length, directory)
+            offsets = stone_count_offsets(size)
+            random_state = np.random.RandomState(0)
+            indices = random_state.randint(offsets[3], offsets[size * size - 2], 4 * positions)
+            indices = indices[tablebase.reachable(indices)]
+            boards = unrank_boards(indices, size)
+            first_line, second_line = line_owners(boards, size, winning_length)
+            boards = boards[~(first_line | second_line)][:positions]
+
+            found = 0
+            for threes in (False, True):
+                search = ThreatSpaceSearch(size, winning_length, threes=threes)
+                for board, side in zip(boards, side_to_move(boards)):
+                    move = search.solve(board, side)
+                    if move is None:
+                        continue
+                    found += 1
+                    after = board.copy()
+                    after[move] = side
+                    self.assertEqual(tablebase.lookup(board)[0], 1, (board, threes))
+                    self.assertEqual(tablebase.lookup(after)[0], -1, (board, move, threes))
+            self.assertGreater(found, min_found)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_found_moves_win_on_3x3(self):
+        self.assert_found_moves_win(3, 3, 1000, 1000)
+
+    def test_found_moves_win_on_4x4(self):
+        self.assert_found_moves_win(4, 3, 1500, 2000)
+
+
+if __name__ == '__main__':
+    unittest.main()
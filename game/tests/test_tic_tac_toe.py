@@ -2,7 +2,8 @@ import numpy as np
 import unittest
 
 from game.tic_tac_toe import apply_move, apply_move_inplace, clean_board, available_moves, determine_line_winner, \
-    diagonals_of_the_board_longer_equals_winning_length, determine_board_winner
+    diagonals_of_the_board_longer_equals_winning_length, determine_board_winner, hash_board, unhash_board, GameState, \
+    generate_winners
 
 
 class TestTicTacToe(unittest.TestCase):
@@ -169,12 +170,95 @@ class TestTicTacToe(unittest.TestCase):
 
         self.assertEqual(determine_board_winner(board, winning_length), side)
 
+    def test_determine_board_winner_on_line_shorter_than_the_board(self):
+        size = 4
+        winning_length = 3
+        side = -1
+
+        for positions in (((0, 1), (0, 2), (0, 3)), ((1, 3), (2, 3), (3, 3)), ((1, 1), (2, 2), (3, 3))):
+            board = clean_board(size)
+            for position in positions:
+                apply_move_inplace(board, position, side)
+
+            self.assertEqual(determine_board_winner(board, winning_length), side)
+
     def test_determine_board_winner_on_draw_board(self):
         board = np.array([[1, -1, 1], [-1, 1, -1], [-1, 1, -1]])
         winning_length = 3
 
         self.assertEqual(determine_board_winner(board, winning_length), 0)
 
+    def test_unhash_board(self):
+        board = np.array([[1, -1, 0], [0, -1, 0], [1, 0, 0]])
+
+        np.testing.assert_array_equal(unhash_board(hash_board(board), 3), board)
+
+
+class TestGameState(unittest.TestCase):
+    def test_new_state(self):
+        state = GameState(3, 3)
+
+        self.assertEqual(state.side_to_play, 1)
+        self.assertEqual(state.empty_count, 9)
+        self.assertEqual(sorted(state.legal_moves), available_moves(clean_board(3)))
+        self.assertFalse(state.finished)
+
+    def test_state_from_board(self):
+        board = np.array([[1, 0, 0], [0, -1, 0], [1, 0, 0]])
+        state = GameState(3, 3, board)
+
+        self.assertEqual(state.side_to_play, -1)
+        self.assertEqual(state.empty_count, 6)
+        self.assertEqual(sorted(state.legal_moves), available_moves(board))
+
+    def test_play_and_undo(self):
+        state = GameState(3, 3)
+
+        state.play((1, 1))
+        self.assertEqual(state.board[1, 1], 1)
+        self.assertEqual(state.side_to_play, -1)
+        self.assertFalse(state.is_legal((1, 1)))
+        self.assertEqual(sorted(state.legal_moves), available_moves(state.board))
+
+        state.undo()
+        np.testing.assert_array_equal(state.board, clean_board(3))
+        self.assertEqual(state.side_to_play, 1)
+        self.assertEqual(state.empty_count, 9)
+        self.assertTrue(state.is_legal((1, 1)))
+
+    def test_play_on_taken_field(self):
+        state = GameState(3, 3)
+        state.play((0, 0))
+
+        self.assertRaises(ValueError, state.play, (0, 0))
+
+    def test_is_legal_with_unhashable_move(self):
+        self.assertFalse(GameState(3, 3).is_legal([0, 0]))
+
+    def test_winner_is_tracked_incrementally(self):
+        random_state = np.random.RandomState(0)
+        for size, winning_length in ((3, 3), (4, 3), (5, 4)):
+            for _ in range(50):
+                state = GameState(size, winning_length)
+                winners = []
+                while not state.finished:
+                    state.play(state.legal_moves[random_state.randint(len(state.legal_moves))])
+                    winners.append(state.winner)
+                    self.assertEqual(state.winner, determine_board_winner(state.board, winning_length))
+                    self.assertEqual(state.empty_count, len(available_moves(state.board)))
+
+                while winners:
+                    self.assertEqual(state.winner, winners.pop())
+                    state.undo()
+                np.testing.assert_array_equal(state.board, clean_board(size))
+
+    def test_generate_winners(self):
+        winners = generate_winners(clean_board(3), 1)
+
+        self.assertEqual(len(winners), 255168)
+        self.assertEqual(winners.count(1), 131184)
+        self.assertEqual(winners.count(-1), 77904)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,215 @@
+import functools
+import time
+
+import numpy as np
+
+INFINITY = 10 ** 9
+
+
+@functools.lru_cache(maxsize=None)
+def line_windows(size, winning_length):
+    """
+    Returns flat indices of all the windows of `winning_length` consecutive cells in rows, columns and diagonals.
+
+    Args:
+        size: The size of the side of the board.
+        winning_length: The number of moves in a row needed for a win.
+
+    Returns:
+        Read only numpy array of shape (windows, winning_length).
+    """
+    indices = np.arange(size * size).reshape(size, size)
+    span = size - winning_length + 1
+    windows = []
+    for i in range(size):
+        for j in range(span):
+            windows.append(indices[i, j:j + winning_length])
+            windows.append(indices[j:j + winning_length, i])
+    for i in range(span):
+        for j in range(span):
+            window = indices[i:i + winning_length, j:j + winning_length]
+            windows.append(window.diagonal())
+            windows.append(window[:, ::-1].diagonal())
+
+    windows = np.array(windows)
+    windows.setflags(write=False)
+    return windows
+
+
+class _Node:
+    __slots__ = ('move', 'parent', 'attacker_to_move', 'children', 'proof', 'disproof')
+
+    def __init__(self, move, parent, attacker_to_move):
+        self.move = move
+        self.parent = parent
+        self.attacker_to_move = attacker_to_move
+        self.children = None
+        self.proof = 1
+        self.disproof = 1
+
+
+class ThreatSpaceSearch:
+    """Proof-number search over forcing moves looking for a guaranteed win of the attacker.
+
+    The attacker only plays moves creating a four, that is a window one stone short of a win, or blocks of the
+    defender's four. The defender answers a four with its only block. With `threes` enabled the attacker may also create
+    threes and the defender then considers every empty square, which keeps the proofs sound but widens the search.
+
+    Every proof is a real forced win. Failing to find one only means there is no win within the threat space explored
+    in `max_nodes` nodes.
+
+    Args:
+        size: The size of the side of the board.
+        winning_length: The number of moves in a row needed for a win.
+        max_nodes: Maximal number of nodes created in a single search.
+        threes: Whether the attacker may play moves creating threes.
+    """
+
+    def __init__(self, size, winning_length, max_nodes=100000, threes=False):
+        self.size = size
+        self.winning_length = winning_length
+        self.max_nodes = max_nodes
+        self.threes = threes
+        self.windows = line_windows(size, winning_length)
+        self.nodes = 0
+
+    def solve(self, board, side):
+        """
+        Looks for a forced win of the side to play.
+
+        Args:
+            board: The board of shape (size, size).
+            side: The side to play and the attacker, 1 for the first player, -1 for the second player.
+
+        Returns:
+            tuple: The winning move or None if no forced win was found.
+        """
+        board = np.array(board).ravel()
+        self.nodes = 1
+
+        winning_squares = self._squares(self._window_counts(board), side, self.winning_length - 1)
+        if len(winning_squares) > 0:
+            return divmod(int(winning_squares[0]), self.size)
+
+        root = _Node(None, None, True)
+        while root.proof != 0 and root.disproof != 0 and self.nodes < self.max_nodes:
+            node = root
+            while node.children:
+                mover = side if node.attacker_to_move else -side
+                if node.attacker_to_move:
+                    node = min(node.children, key=lambda child: child.proof)
+                else:
+                    node = min(node.children, key=lambda child: child.disproof)
+                board[node.move] = mover
+
+            self._expand(node, board, side)
+
+            while node is not None:
+                self._update(node)
+                if node.move is not None:
+                    board[node.move] = 0
+                node = node.parent
+
+        if root.proof == 0:
+            move = next(child.move for child in root.children if child.proof == 0)
+            return divmod(int(move), self.size)
+        return None
+
+    def _window_counts(self, board):
+        """Returns the mask of empty cells of every window and the number of stones of each side in every window."""
+        cells = board[self.windows]
+        return cells == 0, {1: (cells == 1).sum(axis=1), -1: (cells == -1).sum(axis=1)}
+
+    def _squares(self, window_counts, side, stones):
+        """Returns the empty squares of the windows with the given number of stones of the side and none of the
+        opponent."""
+        empty, counts = window_counts
+        mask = (counts[side] == stones) & (counts[-side] == 0)
+        return np.unique(self.windows[mask][empty[mask]])
+
+    def _expand(self, node, board, attacker):
+        moves = self._candidate_moves(board, attacker, node.attacker_to_move)
+        if moves is True:
+            node.children = ()
+            node.proof, node.disproof = 0, INFINITY
+        elif moves is False:
+            node.children = ()
+            node.proof, node.disproof = INFINITY, 0
+        else:
+            node.children = [_Node(move, node, not node.attacker_to_move) for move in moves]
+            self.nodes += len(node.children)
+
+    def _candidate_moves(self, board, attacker, attacker_to_move):
+        """Returns True if the attacker has won, False if the attacker has no forcing continuation, otherwise the moves
+        to search."""
+        to_move = attacker if attacker_to_move else -attacker
+        window_counts = self._window_counts(board)
+        if self._squares(window_counts, to_move, self.winning_length - 1).size > 0:
+            return attacker_to_move
+
+        threats = self._squares(window_counts, -to_move, self.winning_length - 1)
+        if threats.size > 1:
+            return not attacker_to_move
+        if threats.size == 1:
+            return threats
+
+        if attacker_to_move:
+            moves = self._squares(window_counts, attacker, self.winning_length - 2)
+            if self.threes and self.winning_length > 2:
+                moves = np.union1d(moves, self._squares(window_counts, attacker, self.winning_length - 3))
+        elif self.threes:
+            moves = np.flatnonzero(board == 0)
+        else:
+            return False
+
+        return moves if moves.size > 0 else False
+
+    @staticmethod
+    def _update(node):
+        if not node.children:
+            return
+        if node.attacker_to_move:
+            node.proof = min(child.proof for child in node.children)
+            node.disproof = min(INFINITY, sum(child.disproof for child in node.children))
+        else:
+            node.proof = min(INFINITY, sum(child.proof for child in node.children))
+            node.disproof = min(child.disproof for child in node.children)
+
+
+def forced_win_move(board, side, winning_length, max_nodes=10000, threes=False):
+    """
+    Returns the move guaranteeing the win for the side to play or None when the threat space search finds none. Cheap
+    enough to be used by search players as a pre-pass before their own search.
+    """
+    search = ThreatSpaceSearch(len(board), winning_length, max_nodes, threes)
+    return search.solve(board, side)
+
+
+def _endgame_suite(size, positions, stones, seed):
+    random_state = np.random.RandomState(seed)
+    suite = []
+    center = size // 2
+    for _ in range(positions):
+        board = np.zeros((size, size), dtype=int)
+        cells = np.clip(np.round(random_state.normal(center, size / 6., (4 * stones, 2))), 0, size - 1).astype(int)
+        side, placed = 1, 0
+        for row, column in cells:
+            if board[row, column] == 0 and placed < 2 * stones:
+                board[row, column] = side
+                side, placed = -side, placed + 1
+        suite.append(board)
+    return suite
+
+
+if __name__ == '__main__':
+    for size, winning_length, stones in ((15, 5, 12), (15, 5, 20), (9, 4, 8)):
+        for threes in (False, True):
+            search = ThreatSpaceSearch(size, winning_length, max_nodes=20000, threes=threes)
+            solved, nodes, start = 0, 0, time.time()
+            suite = _endgame_suite(size, 100, stones, seed=0)
+            for position in suite:
+                solved += search.solve(position, 1) is not None
+                nodes += search.nodes
+            elapsed = time.time() - start
+            print("board: %sx%s/%s stones: %s threes: %s solve_rate: %.2f nodes/sec: %.0f" %
+                  (size, size, winning_length, 2 * stones, threes, solved / float(len(suite)), nodes / elapsed))
@@ -1,4 +1,9 @@
 import itertools
+import random
+import re
+import time
+import tracemalloc
+
 import numpy as np
 
 
@@ -105,17 +110,11 @@ def determine_board_winner(board, winning_length):
         int: 1 if player one has won, -1 if player 2 has won, otherwise 0.
     """
 
-    for row in board:
-        if determine_line_winner(row, winning_length):
-            return row[0]
-
-    for column in board.T:
-        if determine_line_winner(column, winning_length):
-            return column[0]
-
-    for diagonal in diagonals_of_the_board_longer_equals_winning_length(board, winning_length):
-        if determine_line_winner(diagonal, winning_length):
-            return diagonal[0]
+    lines = itertools.chain(board, board.T, diagonals_of_the_board_longer_equals_winning_length(board, winning_length))
+    for line in lines:
+        winner = determine_line_winner(line, winning_length)
+        if winner:
+            return winner
 
     return 0
 
@@ -199,84 +198,281 @@ def hash_board(board):
     return ''.join(map(str, (itertools.chain(*board.tolist()))))
 
 
+def unhash_board(board_hash, size):
+    """
+    Returns the board from its hash created with `hash_board`.
+
+    Args:
+        board_hash: The hash of the board.
+        size: The size of the side of the board.
+
+    Returns:
+        Numpy array of shape (size, size).
+    """
+    return np.array([int(cell) for cell in re.findall('-?[0-9]', board_hash)]).reshape(size, size)
+
+
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+class GameState:
+    """Board with the moves applied in place and undone in O(1).
+
+    The legal moves, the number of empty fields and the winner are updated with every move instead of being recomputed
+    from the whole board. The winner is found by checking only the lines through the last move.
+
+    The `board` and `legal_moves` are modified in place by `play` and `undo`, callers keeping them between moves have
+    to copy them.
+
+    Args:
+        size: The size of the side of the board.
+        winning_length: The number of moves in a row needed for a win.
+        board: Optional starting board, an empty board by default. The board is copied.
+        side_to_play: The side to make the next move, by default 1 if both sides have the same number of stones,
+            otherwise -1.
+    """
+
+    def __init__(self, size, winning_length, board=None, side_to_play=None):
+        self.size = size
+        self.winning_length = winning_length
+        self.board = clean_board(size) if board is None else np.array(board)
+        if side_to_play is None:
+            side_to_play = 1 if np.sum(self.board) == 0 else -1
+        self.side_to_play = side_to_play
+        self.positions = [(row, column) for row in range(size) for column in range(size)]
+        self.legal_moves = [position for position in self.positions if self.board[position] == 0]
+        self.empty_count = len(self.legal_moves)
+        self.winner = determine_board_winner(self.board, winning_length)
+        self._legal_move_indices = {move: index for index, move in enumerate(self.legal_moves)}
+        self._history = []
+
+    @property
+    def finished(self):
+        return self.winner != 0 or self.empty_count == 0
+
+    def is_legal(self, move):
+        try:
+            return move in self._legal_move_indices
+        except TypeError:
+            return False
+
+    def play(self, move):
+        """
+        Applies the move for the side to play.
+
+        Args:
+            move: Tuple with the position of the move.
+        """
+        apply_move_inplace(self.board, move, self.side_to_play)
+
+        # swap the last legal move into the place of the played one
+        index = self._legal_move_indices.pop(move)
+        last_move = self.legal_moves.pop()
+        if index < len(self.legal_moves):
+            self.legal_moves[index] = last_move
+            self._legal_move_indices[last_move] = index
+        self.empty_count -= 1
+
+        self._history.append((move, self.winner))
+        if self.winner == 0 and self._completes_line(move):
+            self.winner = self.side_to_play
+        self.side_to_play = -self.side_to_play
+
+    def undo(self):
+        """Takes back the last move."""
+        move, self.winner = self._history.pop()
+        self.board[move] = 0
+        self._legal_move_indices[move] = len(self.legal_moves)
+        self.legal_moves.append(move)
+        self.empty_count += 1
+        self.side_to_play = -self.side_to_play
+
+    def _completes_line(self, move):
+        board = self.board
+        size = self.size
+        row, column = move
+        side = board[move]
+
+        for row_step, column_step in DIRECTIONS:
+            count = 1
+            for direction in (1, -1):
+                next_row, next_column = row + direction * row_step, column + direction * column_step
+                while 0 <= next_row < size and 0 <= next_column < size and board[next_row, next_column] == side:
+                    count += 1
+                    next_row, next_column = next_row + direction * row_step, next_column + direction * column_step
+            if count >= self.winning_length:
+                return True
+
+        return False
+
+
 def player_to_play(player1, player2, side_to_play):
     return player1 if side_to_play == 1 else player2
 
 
 def play_game(size, winning_length, player1, player2):
-    board = clean_board(size)
-    side_to_play = 1
-    legal_moves = available_moves(board)
-    winner = 0
+    state = GameState(size, winning_length)
 
-    while len(legal_moves) > 0 and not winner:
-        player = player_to_play(player1, player2, side_to_play)
-        board = apply_move(board, player(legal_moves), side_to_play)
-        winner = determine_board_winner(board, winning_length)
-        legal_moves = available_moves(board)
-        side_to_play = -side_to_play
+    while state.legal_moves and not state.winner:
+        player = player_to_play(player1, player2, state.side_to_play)
+        state.play(player(state.legal_moves))
 
-    return winner
+    return state.winner
 
 
 def playya_game(board_size, plus_player_func, minus_player_func, log=False, winning_length=3):
-    board = clean_board(board_size)
-    side_to_play = 1
-    while True:
-        legal_moves = available_moves(board)
+    """
+    Plays the game between two players called with the board and their side.
+
+    The players get the board the moves are applied to in place, a player keeping the board between its moves has to
+    copy it.
 
-        if len(legal_moves) == 0:
+    Returns:
+        float: 1 if the plus player has won, -1 if the minus player has won or 0 for a draw. A player making an illegal
+        move loses.
+    """
+    state = GameState(board_size, winning_length)
+    while True:
+        if state.empty_count == 0:
             if log:
                 print("no moves left, game ended a draw")
             return 0.
 
+        side_to_play = state.side_to_play
         if side_to_play == 1:
-            move = plus_player_func(board, 1)
+            move = plus_player_func(state.board, 1)
         else:
-            move = minus_player_func(board, -1)
+            move = minus_player_func(state.board, -1)
 
-        if move not in legal_moves:
+        if not state.is_legal(move):
             if log:
                 print("illegal move: {}, for player: {}".format(move, side_to_play))
             return -side_to_play
 
-        board = apply_move(board, move, side_to_play)
+        state.play(move)
         if log:
-            print(board)
+            print(state.board)
 
-        winner = determine_board_winner(board, winning_length)
-        if winner != 0:
+        if state.winner != 0:
             if log:
                 print("we have a winner, side: %s" % side_to_play)
-            return winner
-        side_to_play = -side_to_play
+            return state.winner
 
 
 def generate_boards(board, side_to_play):
-    legal_moves = available_moves(board)
-    winner = determine_board_winner(board, 3)
-    if len(legal_moves) == 0 or winner != 0:
+    state = GameState(len(board), 3, board, side_to_play)
+    if state.finished:
         return [board.tolist()]
-    else:
-        result = []
-        for move in legal_moves:
-            new_board = apply_move(board, move, side_to_play)
-            result_board = generate_boards(new_board, -side_to_play)
-            if new_board.tolist() not in result_board:
-                result.append(new_board.tolist())
 
-            result += result_board
-        return result
+    result = []
+    _collect_boards(state, result)
+    return result
+
+
+def _collect_boards(state, result):
+    board = state.board
+    for move in state.positions:
+        if board[move] != 0:
+            continue
+        state.play(move)
+        result.append(board.tolist())
+        if not state.finished:
+            _collect_boards(state, result)
+        state.undo()
 
 
 def generate_winners(board, side_to_play):
+    state = GameState(len(board), 3, board, side_to_play)
+    if state.finished:
+        return [state.winner]
+
+    result = []
+    _collect_winners(state, result)
+    return result
+
+
+def _collect_winners(state, result):
+    board = state.board
+    for move in state.positions:
+        if board[move] != 0:
+            continue
+        state.play(move)
+        if state.finished:
+            result.append(state.winner)
+        else:
+            _collect_winners(state, result)
+        state.undo()
+
+
+def _copy_based_winners(board, side_to_play):
+    """The enumeration creating a new board for every move, kept as the baseline."""
     legal_moves = available_moves(board)
     winner = determine_board_winner(board, 3)
     if len(legal_moves) == 0 or winner != 0:
         return [winner]
-    else:
-        result = []
-        for move in legal_moves:
-            new_board = apply_move(board, move, side_to_play)
-            result += generate_winners(new_board, -side_to_play)
+
+    result = []
+    for move in legal_moves:
+        result += _copy_based_winners(apply_move(board, move, side_to_play), -side_to_play)
     return result
+
+
+def _copy_based_game(size, winning_length):
+    board = clean_board(size)
+    side_to_play = 1
+    legal_moves = available_moves(board)
+    winner = 0
+
+    while len(legal_moves) > 0 and not winner:
+        board = apply_move(board, random.choice(legal_moves), side_to_play)
+        winner = determine_board_winner(board, winning_length)
+        legal_moves = available_moves(board)
+        side_to_play = -side_to_play
+
+    return winner
+
+
+def _in_place_game(size, winning_length):
+    state = GameState(size, winning_length)
+
+    while state.legal_moves and not state.winner:
+        state.play(random.choice(state.legal_moves))
+
+    return state.winner
+
+
+def _measure(function, *args):
+    """Returns the result, the wall time and the peak of the traced memory of a single call."""
+    start = time.time()
+    result = function(*args)
+    elapsed = time.time() - start
+
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, elapsed, peak
+
+
+if __name__ == '__main__':
+    nodes = 549946  # positions in the full game tree of 3x3 tic tac toe
+    for name, enumerate_winners in (('copy', _copy_based_winners), ('in place', generate_winners)):
+        winners, elapsed, peak = _measure(enumerate_winners, clean_board(3), 1)
+        print("enumeration %s: leaves: %s nodes/sec: %.0f peak memory: %.1f MB" %
+              (name, len(winners), nodes / elapsed, peak / 2. ** 20))
+
+    for size, winning_length, games in ((3, 3, 5000), (7, 4, 500), (15, 5, 100)):
+        for name, play in (('copy', _copy_based_game), ('in place', _in_place_game)):
+            start = time.time()
+            for _ in range(games):
+                play(size, winning_length)
+            elapsed = time.time() - start
+
+            tracemalloc.start()
+            play(size, winning_length)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print("random games %sx%s %s: games/sec: %.0f peak memory per game: %.1f KB" %
+                  (size, size, name, games / elapsed, peak / 1024.))
+
@@ -1,7 +1,13 @@
+import collections
+import time
+
 import numpy as np
 
-from game.tic_tac_toe import hash_board, available_moves, determine_board_winner, apply_move, clean_board, evaluate
+from game.codec import rank_boards, state_count
+from game.kernels import determine_board_winner
+from game.tic_tac_toe import hash_board, available_moves, apply_move, clean_board, evaluate, unhash_board
 from players.random_player import RandomPlayer
+from utils.metrics import result_rates
 
 
 def dict_max_key(dictionary):
@@ -9,10 +15,16 @@ def dict_max_key(dictionary):
 
 
 class QPlayer:
-    def __init__(self, side, winning_length):
+    # defaults for players pickled before the learning rate and the discount became parameters, e.g. qlr.pkl
+    learning_rate = 0.3
+    discount = 0.9
+
+    def __init__(self, side, winning_length, learning_rate=0.3, discount=0.9):
         self.q_table = {}
         self.side = side
         self.winning_length = winning_length
+        self.learning_rate = learning_rate
+        self.discount = discount
 
     def add_board(self, board):
         board_hash = hash_board(board)
@@ -27,71 +39,164 @@ class QPlayer:
         return dict_max_key(self.q_table[board_hash])
 
     def calculate_reward(self, board):
-        return determine_board_winner(board, self.winning_length)
+        return determine_board_winner(board, self.winning_length) * self.side
 
-    def learn_q(self, board, move):
-        board_hash = self.add_board(board)
-        new_board = apply_move(board, move, self.side)
-        new_board_hash = self.add_board(new_board)
+    def learn_q(self, board, move, next_board):
+        """
+        Updates the Q value of the move towards the result of the game, or towards the discounted best Q value of the
+        board the Q player moves from next.
 
-        reward = self.calculate_reward(new_board)
+        Args:
+            board: Board the Q player moved from.
+            move: Move the Q player played.
+            next_board: Board after the reply of the opponent, or after the move if it ended the game.
+
+        Returns:
+            float: Change of the Q value.
+        """
+        board_hash = self.add_board(board)
+        reward = self.calculate_reward(next_board)
 
-        if reward != 0 or len(available_moves(new_board_hash)) == 0:
+        if reward != 0 or len(available_moves(next_board)) == 0:
             expected = reward
         else:
-            expected_rewards = self.q_table[new_board_hash]
+            expected = self.discount * max(self.q_table[self.add_board(next_board)].values())
 
-            expected = reward + (0.9 * max(expected_rewards.values()))
-
-        change = 0.3 * (expected - self.q_table[board_hash][move])
+        change = self.learning_rate * (expected - self.q_table[board_hash][move])
         self.q_table[board_hash][move] += change
 
+        return change
+
+    def to_array(self, size=3):
+        """
+        Returns the Q table as an array indexed by the perfect state index of `game.codec.rank_boards` and the flat
+        move index, so that it can be shared between processes with `utils.shared_arrays.SharedArrayStore`.
+
+        Args:
+            size: The size of the side of the board.
+
+        Returns:
+            Numpy array of float64 of shape (state_count(size), size * size), NaN for unknown values.
+        """
+        q_values = np.full((state_count(size), size * size), np.nan)
+        board_hashes = list(self.q_table)
+        if board_hashes:
+            indices = rank_boards(np.array([unhash_board(board_hash, size) for board_hash in board_hashes]))
+            for index, board_hash in zip(indices, board_hashes):
+                for (row, column), value in self.q_table[board_hash].items():
+                    q_values[index, row * size + column] = value
+
+        return q_values
+
+
+class ArrayQPlayer:
+    """Greedy player reading the Q values from an array created with `QPlayer.to_array`, e.g. a read only view of
+    the shared memory. Unknown moves are valued 1.0, the same as the initial values of QPlayer."""
+
+    def __init__(self, side, q_values):
+        self.side = side
+        self.q_values = q_values
+        self.size = int(round(np.sqrt(q_values.shape[1])))
+
+    def get_move(self, board, side=None):
+        values = self.q_values[rank_boards(board[np.newaxis])[0]]
+        values = np.where(board.ravel() == 0, np.nan_to_num(values, nan=1.0), -np.inf)
+        return divmod(int(np.argmax(values)), self.size)
+
 
 def swap_players(p1, p2):
     return p2, p1
 
 
+def train_q_player(qplayer, opponent, games, winning_length, board_size=3, log_every=1000, metrics=None,
+                   callback=None):
+    """
+    Trains the Q player by playing games against the opponent, the Q player always moves first.
+
+    Args:
+        qplayer: QPlayer to train.
+        opponent: Player with the `get_move(board, side)` method.
+        games: Number of games to play.
+        winning_length: The number of moves in a row needed for a win.
+        board_size: The size of the side of the board.
+        log_every: Number of games between logged metrics.
+        metrics: Optional MetricsLogger receiving results, speed, Q table size and the mean absolute update.
+        callback: Optional function called every `log_every` games with the episode number and the recent win rate,
+            training stops when it returns True.
+
+    Returns:
+        dict: Number of games per result, 1 for a Q player win, 0 for a draw and -1 for a loss.
+    """
+    results = {1: 0,
+               0: 0,
+               -1: 0}
+    recent_results = collections.deque(maxlen=log_every)
+    log_start, log_samples, log_changes = time.time(), 0, 0.
+
+    for episode_number in range(1, games + 1):
+        board = clean_board(board_size)
+
+        while True:
+            move = qplayer.get_move(board)
+            next_board = apply_move(board, move, qplayer.side)
+            winner = determine_board_winner(next_board, winning_length)
+
+            if winner == 0 and len(available_moves(next_board)) > 0:
+                reply = opponent.get_move(next_board, opponent.side)
+                next_board = apply_move(next_board, reply, opponent.side)
+                winner = determine_board_winner(next_board, winning_length)
+
+            # the move is learned after the reply, so losses and the board the Q player moves from next feed back
+            log_changes += abs(qplayer.learn_q(board, move, next_board))
+            log_samples += 1
+            board = next_board
+
+            if winner != 0 or len(available_moves(board)) == 0:
+                break
+
+        results[winner * qplayer.side] += 1
+        recent_results.append(winner * qplayer.side)
+
+        if episode_number % log_every == 0:
+            win_rate, draw_rate, loss_rate = result_rates(recent_results)
+            if metrics is not None:
+                elapsed = max(time.time() - log_start, 1e-9)
+                metrics.scalar('results/win_rate', win_rate, episode_number)
+                metrics.scalar('results/draw_rate', draw_rate, episode_number)
+                metrics.scalar('results/loss_rate', loss_rate, episode_number)
+                metrics.scalar('speed/episodes_per_sec', len(recent_results) / elapsed, episode_number)
+                metrics.scalar('speed/samples_per_sec', log_samples / elapsed, episode_number)
+                metrics.scalar('train/mean_abs_update', log_changes / max(log_samples, 1), episode_number)
+                metrics.scalar('train/q_table_size', len(qplayer.q_table), episode_number)
+            log_start, log_samples, log_changes = time.time(), 0, 0.
+            if callback is not None and callback(episode_number, win_rate):
+                break
+
+    return results
+
+
 if __name__ == '__main__':
+    import importlib.util
+    import pickle
+
+    from utils.metrics import create_metrics_logger
+
     qplayer = QPlayer(1, 3)
     rplayer = RandomPlayer(-1)
     winning_length = 3
     games = 10000
 
-    results = {1: 0,
-               0: 0,
-               -1: 0}
-    import tqdm
-    import pickle
+    with create_metrics_logger('Graphs/q_learning',
+                               tensorboard=importlib.util.find_spec('tensorflow') is not None) as metrics_logger:
+        results = train_q_player(qplayer, rplayer, games, winning_length, metrics=metrics_logger)
 
-    # for i in tqdm.tqdm(range(games)):
-    #     board = clean_board(3)
-    #     winner = 0
-    #     # print(i)
-    #
-    #     while True:
-    #         move = qplayer.get_move(board)
-    #         qplayer.learn_q(board, move)
-    #         board = apply_move(board, move, qplayer.side)
-    #         winner = determine_board_winner(board, winning_length)
-    #
-    #         if winner != 0 or len(available_moves(board)) == 0:
-    #             break
-    #
-    #         move = rplayer.get_move(board)
-    #         board = apply_move(board, move, rplayer.side)
-    #         winner = determine_board_winner(board, winning_length)
-    #
-    #         if winner != 0 or len(available_moves(board)) == 0:
-    #             break
-    #
-    #     results[winner] += 1
-    #
-    # print()
-    # for k, v in results.items():
-    #     print("{}: {}".format(k, v))
-    #
-    # with open('qlr.pkl', 'wb') as handle:
-    #     pickle.dump(qplayer, handle)
+    print()
+    for k, v in results.items():
+        print("{}: {}".format(k, v))
+
+    # saved next to the committed qlr.pkl instead of overwriting it
+    with open('qlr_trained.pkl', 'wb') as handle:
+        pickle.dump(qplayer, handle)
 
     with open('qlr.pkl', 'rb') as handle:
         qplayer = pickle.load(handle)
@@ -111,4 +216,3 @@ if __name__ == '__main__':
             print(board)
             print(evaluate(board, 3))
             print()
-
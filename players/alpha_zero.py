@@ -0,0 +1,333 @@
+import functools
+
+import numpy as np
+
+from game.codec import pack_boards, unpack_boards
+from players.mcts import SearchTree, choose_move, expand_roots, search, visit_policies
+from utils.shared_arrays import SharedArrayView
+
+# weights published by the trainer, attached once per worker process by `attach_shared_weights`
+_shared_weights = None
+
+
+def policy_value_forward(weights, boards):
+    """Evaluates the policy/value network in numpy, so that self-play workers do not need a TensorFlow session.
+
+    Args:
+        weights (list of np.array): Values of the variables returned by
+            `utils.network_utils.create_policy_value_network`.
+        boards (np.array): Boards of shape (N, board_squares) seen from the side to play.
+
+    Returns:
+        Tuple of (N, board_squares) move probabilities and (N,) values.
+    """
+    last_layer = np.asarray(boards, dtype=np.float32)
+    for hidden_weights, hidden_bias in zip(weights[:-4:2], weights[1:-4:2]):
+        last_layer = np.maximum(last_layer.dot(hidden_weights) + hidden_bias, 0)
+
+    logits = last_layer.dot(weights[-4]) + weights[-3]
+    logits -= logits.max(axis=1, keepdims=True)
+    probabilities = np.exp(logits)
+    probabilities /= probabilities.sum(axis=1, keepdims=True)
+    values = np.tanh(last_layer.dot(weights[-2]) + weights[-1])[:, 0]
+
+    return probabilities, values
+
+
+def random_weights(board_squares, hidden_layers, seed=None):
+    """Returns randomly initialized weights in the layout of `create_policy_value_network`."""
+    random_state = np.random.RandomState(seed)
+    weights = []
+    last_units = board_squares
+    for units in hidden_layers:
+        weights.append(random_state.normal(0, 1. / np.sqrt(last_units), (last_units, units)).astype(np.float32))
+        weights.append(np.full(units, 0.01, dtype=np.float32))
+        last_units = units
+
+    for units in (board_squares, 1):
+        weights.append(random_state.normal(0, 1. / np.sqrt(last_units), (last_units, units)).astype(np.float32))
+        weights.append(np.full(units, 0.01, dtype=np.float32))
+
+    return weights
+
+
+def load_weights(path):
+    """Loads the weights saved with `np.savez(path, *weights)`."""
+    data = np.load(path)
+    return [data['arr_%d' % index] for index in range(len(data.files))]
+
+
+def dihedral_symmetries(boards, policies, size):
+    """
+    Returns the 8 rotations and reflections of every example.
+
+    Args:
+        boards: Array of shape (N, size * size).
+        policies: Array of shape (N, size * size) with the move probabilities or the visit counts of the boards.
+        size: The size of the side of the board.
+
+    Returns:
+        Tuple of arrays of shape (8 * N, size * size).
+    """
+    boards = boards.reshape(-1, size, size)
+    policies = policies.reshape(-1, size, size)
+    symmetric_boards, symmetric_policies = [], []
+    for k in range(4):
+        rotated_boards, rotated_policies = np.rot90(boards, k, axes=(1, 2)), np.rot90(policies, k, axes=(1, 2))
+        symmetric_boards.extend([rotated_boards, rotated_boards[:, :, ::-1]])
+        symmetric_policies.extend([rotated_policies, rotated_policies[:, :, ::-1]])
+
+    return (np.concatenate(symmetric_boards).reshape(-1, size * size),
+            np.concatenate(symmetric_policies).reshape(-1, size * size))
+
+
+class ReplayBuffer:
+    """Ring buffer of self-play examples stored in preallocated arrays. The policies are kept as root visit counts of
+    uint16 and the values as int8, they are converted to float32 probabilities and values only when sampled.
+
+    Args:
+        capacity: Maximum number of examples, the oldest examples are overwritten first.
+        board_squares: Number of squares of the board.
+    """
+
+    def __init__(self, capacity, board_squares):
+        self.capacity = capacity
+        self.boards = np.zeros((capacity, board_squares), dtype=np.int8)
+        self.visits = np.zeros((capacity, board_squares), dtype=np.uint16)
+        self.values = np.zeros(capacity, dtype=np.int8)
+        self.size = 0
+        self.position = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, boards, visits, values):
+        indices = (self.position + np.arange(len(values))) % self.capacity
+        self.boards[indices] = boards
+        self.visits[indices] = visits
+        self.values[indices] = values
+        self.position = (self.position + len(values)) % self.capacity
+        self.size = min(self.size + len(values), self.capacity)
+
+    def sample(self, batch_size):
+        indices = np.random.randint(0, self.size, batch_size)
+        return self.boards[indices], visit_policies(self.visits[indices]), self.values[indices].astype(np.float32)
+
+    def _chronological_indices(self):
+        start = self.position if self.size == self.capacity else 0
+        return (start + np.arange(self.size)) % self.capacity
+
+    def save(self, path):
+        """Saves the examples from the oldest to the newest with boards packed into 2 bits per cell."""
+        size = int(round(np.sqrt(self.boards.shape[1])))
+        indices = self._chronological_indices()
+        np.savez_compressed(path, size=size, boards=pack_boards(self.boards[indices]), visits=self.visits[indices],
+                            values=self.values[indices])
+
+    @classmethod
+    def load(cls, path, capacity):
+        data = np.load(path)
+        size = int(data['size'])
+        buffer = cls(capacity, size * size)
+        boards = unpack_boards(data['boards'][-capacity:], size).reshape(-1, size * size)
+        buffer.add(boards, data['visits'][-capacity:], data['values'][-capacity:])
+        return buffer
+
+
+def self_play(weights, games, size, winning_length, simulations, c_puct=1.5, leaves_per_tree=1, temperature_moves=2,
+              dirichlet_alpha=0.3, noise_fraction=0.25, seed=None):
+    """
+    Plays the games concurrently, so that the leaves of all the searches are evaluated in shared batches.
+
+    Args:
+        weights: Weights of the policy/value network.
+        games: Number of games to play.
+        size: The size of the side of the board.
+        winning_length: The number of moves in a row needed for a win.
+        simulations: Number of simulations per move.
+        c_puct: Exploration constant of the search.
+        leaves_per_tree: Number of leaves selected in each tree before a batched evaluation.
+        temperature_moves: Number of opening moves per game sampled proportionally to the visit counts, later moves
+            pick the most visited move.
+        dirichlet_alpha: Concentration of the Dirichlet noise added to the root priors.
+        noise_fraction: Weight of the noise in the root priors.
+        seed: Seed of the random generator, workers should get different seeds.
+
+    Returns:
+        Tuple (boards, visits, values) of training examples, boards of int8 are seen from the side to play, visits are
+        the uint16 root visit counts of the moves, see `players.mcts.visit_policies`, and values of int8 are the results
+        of the games for that side.
+    """
+    if seed is not None:
+        np.random.seed(seed)
+    evaluate = functools.partial(policy_value_forward, weights)
+    trees = [SearchTree(size, winning_length) for _ in range(games)]
+    histories = [[] for _ in range(games)]
+    boards, visits, values = [], [], []
+    active = list(range(games))
+
+    while active:
+        active_trees = [trees[game] for game in active]
+        expand_roots(active_trees, evaluate)
+        for tree in active_trees:
+            tree.add_exploration_noise(dirichlet_alpha, noise_fraction)
+        search(active_trees, evaluate, simulations, c_puct, leaves_per_tree)
+
+        still_active = []
+        for game in active:
+            tree = trees[game]
+            history = histories[game]
+            history.append((tree.board.ravel() * tree.side_to_play, tree.visit_counts(), tree.side_to_play))
+            tree.advance(choose_move(tree, 1. if len(history) <= temperature_moves else 0.))
+
+            if tree.finished:
+                for board, visit_counts, side in history:
+                    boards.append(board)
+                    visits.append(visit_counts)
+                    values.append(tree.winner * side)
+            else:
+                still_active.append(game)
+        active = still_active
+
+    return np.array(boards, dtype=np.int8), np.array(visits, dtype=np.uint16), np.array(values, dtype=np.int8)
+
+
+def parallel_self_play(pool, weights, games, workers, seed=0, **kwargs):
+    """
+    Splits the games between the worker processes of the pool and concatenates their examples.
+
+    Args:
+        pool: multiprocessing.Pool or None to play in the current process.
+        weights: Weights of the policy/value network or None to let the workers use the newest weights of the store
+            they attached to with `attach_shared_weights`.
+        games: Total number of games to play.
+        workers: Number of chunks the games are split into.
+        seed: Base seed, every chunk gets its own seed derived from it.
+        **kwargs: Passed to `self_play`.
+
+    Returns:
+        Tuple (boards, visits, values) of training examples as returned by `self_play`.
+    """
+    if pool is None:
+        return self_play(weights, games, seed=seed, **kwargs)
+
+    chunks = [games // workers + (1 if worker < games % workers else 0) for worker in range(workers)]
+    tasks = [(weights, chunk, seed * workers + worker) for worker, chunk in enumerate(chunks) if chunk > 0]
+    results = pool.starmap(functools.partial(_self_play_task, **kwargs), tasks)
+    packed_boards, visits, values = (np.concatenate(examples) for examples in zip(*results))
+    board_squares = visits.shape[1]
+
+    return unpack_boards(packed_boards, int(round(np.sqrt(board_squares)))).reshape(-1, board_squares), visits, values
+
+
+def attach_shared_weights(name, directory=None):
+    """Pool initializer attaching the worker to the weights published to the SharedArrayStore of the given name."""
+    global _shared_weights
+    _shared_weights = SharedArrayView(name, directory)
+
+
+def _self_play_task(weights, games, seed, **kwargs):
+    if weights is None:
+        _shared_weights.refresh()
+        weights = _shared_weights.arrays
+
+    # boards travel back to the parent process packed into 2 bits per cell, next to uint16 visits and int8 values
+    boards, visits, values = self_play(weights, games, seed=seed, **kwargs)
+    return pack_boards(boards), visits, values
+
+
+def play_match(weights, opponent_weights, games, size, winning_length, simulations, c_puct=1.5, leaves_per_tree=1,
+               temperature_moves=2):
+    """
+    Plays the games between two networks, each with its own search trees reused between moves. The first network
+    moves first in half of the games.
+
+    Returns:
+        float: Score of the first network, 1 for a win and 0.5 for a draw, divided by the number of games.
+    """
+    evaluators = (functools.partial(policy_value_forward, weights),
+                  functools.partial(policy_value_forward, opponent_weights))
+    trees = [(SearchTree(size, winning_length), SearchTree(size, winning_length)) for _ in range(games)]
+    sides = [1 if game % 2 == 0 else -1 for game in range(games)]
+    moves_played = [0] * games
+    score = 0.
+    active = list(range(games))
+
+    while active:
+        for player, evaluate in enumerate(evaluators):
+            to_move = [trees[game][player] for game in active if _player_to_move(trees[game][0], sides[game]) == player]
+            if to_move:
+                search(to_move, evaluate, simulations, c_puct, leaves_per_tree)
+
+        still_active = []
+        for game in active:
+            player = _player_to_move(trees[game][0], sides[game])
+            move = choose_move(trees[game][player], 1. if moves_played[game] < temperature_moves else 0.)
+            moves_played[game] += 1
+            for tree in trees[game]:
+                tree.advance(move)
+
+            tree = trees[game][0]
+            if tree.finished:
+                score += 0.5 + 0.5 * tree.winner * sides[game]
+            else:
+                still_active.append(game)
+        active = still_active
+
+    return score / games
+
+
+def _player_to_move(tree, first_player_side):
+    return 0 if tree.side_to_play == first_player_side else 1
+
+
+class AlphaZeroPlayer:
+    """Player choosing moves with the search guided by the policy/value network. The search tree is kept between
+    moves as long as the boards it gets differ by the opponent's move only.
+
+    Args:
+        side: The side of the player, 1 for the first player, -1 for the second player.
+        weights: Weights of the policy/value network.
+        size: The size of the side of the board.
+        winning_length: The number of moves in a row needed for a win.
+        simulations: Number of simulations per move.
+        threat_search: Optional `game.threat_space.ThreatSpaceSearch` run before the search, its forced wins are
+            played without searching.
+    """
+
+    def __init__(self, side, weights, size, winning_length, simulations=200, c_puct=1.5, leaves_per_tree=8,
+                 threat_search=None):
+        self.side = side
+        self.evaluate = functools.partial(policy_value_forward, weights)
+        self.size = size
+        self.winning_length = winning_length
+        self.simulations = simulations
+        self.c_puct = c_puct
+        self.leaves_per_tree = leaves_per_tree
+        self.threat_search = threat_search
+        self.tree = None
+
+    def get_move(self, board, side):
+        if self.threat_search is not None:
+            move = self.threat_search.solve(board, side)
+            if move is not None:
+                self.tree = None
+                return move
+
+        tree = self._sync_tree(np.asarray(board), side)
+        search([tree], self.evaluate, self.simulations, self.c_puct, self.leaves_per_tree)
+        move = choose_move(tree)
+        tree.advance(move)
+
+        return divmod(move, self.size)
+
+    def _sync_tree(self, board, side):
+        tree = self.tree
+        if tree is not None and tree.side_to_play == -side:
+            changed = np.flatnonzero(tree.board.ravel() != board.ravel())
+            if len(changed) == 1 and board.flat[changed[0]] == tree.side_to_play:
+                tree.advance(changed[0])
+        if tree is None or tree.side_to_play != side or not np.array_equal(tree.board, board):
+            tree = self.tree = SearchTree(self.size, self.winning_length, board, side)
+
+        return tree
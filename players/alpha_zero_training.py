@@ -0,0 +1,180 @@
+import multiprocessing
+import os
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from players.alpha_zero import ReplayBuffer, attach_shared_weights, dihedral_symmetries, parallel_self_play, \
+    play_match
+from utils.metrics import create_metrics_logger
+from utils.network_utils import create_policy_value_network
+from utils.shared_arrays import SharedArrayStore
+
+
+class PolicyValueTrainer:
+    """Owns the TensorFlow graph and session of the policy/value network and trains it on replay buffer samples.
+
+    Args:
+        board_squares: Number of squares of the board.
+        hidden_layers: Number of units in each of the shared hidden layers.
+        learning_rate: Learning rate of the Adam optimizer.
+        l2: Weight of the L2 regularization of the weight matrices.
+        threads: Number of TensorFlow intra-op threads, 0 lets TensorFlow decide.
+    """
+
+    def __init__(self, board_squares, hidden_layers, learning_rate=1e-3, l2=1e-4, threads=0):
+        self.graph = tf.Graph()
+        with self.graph.as_default():
+            self.input_layer, policy_logits, value_layer, self.variables = create_policy_value_network(board_squares,
+                                                                                                       hidden_layers)
+            self.target_policies = tf.placeholder(tf.float32, shape=(None, board_squares))
+            self.target_values = tf.placeholder(tf.float32, shape=(None,))
+
+            self.policy_loss = tf.reduce_mean(
+                tf.nn.softmax_cross_entropy_with_logits_v2(labels=self.target_policies, logits=policy_logits))
+            self.value_loss = tf.reduce_mean(tf.square(tf.squeeze(value_layer, axis=1) - self.target_values))
+            regularization = l2 * tf.add_n([tf.nn.l2_loss(weights) for weights in self.variables[::2]])
+            self.optimizer = tf.train.AdamOptimizer(learning_rate).minimize(
+                self.policy_loss + self.value_loss + regularization)
+
+            self.weight_placeholders = [tf.placeholder(variable.dtype.base_dtype, shape=variable.get_shape())
+                                        for variable in self.variables]
+            self.assign_weights = tf.group(*[variable.assign(placeholder) for variable, placeholder
+                                             in zip(self.variables, self.weight_placeholders)])
+            initializer = tf.global_variables_initializer()
+
+        config = tf.ConfigProto(device_count={'GPU': 0}, intra_op_parallelism_threads=threads,
+                                inter_op_parallelism_threads=1 if threads else 0)
+        self.session = tf.Session(graph=self.graph, config=config)
+        self.session.run(initializer)
+
+    def get_weights(self):
+        return self.session.run(self.variables)
+
+    def set_weights(self, weights):
+        self.session.run(self.assign_weights, feed_dict=dict(zip(self.weight_placeholders, weights)))
+
+    def train(self, buffer, steps, batch_size):
+        """
+        Runs the optimizer on batches sampled from the replay buffer.
+
+        Returns:
+            Tuple of the mean policy and value losses.
+        """
+        policy_losses, value_losses = [], []
+        for _ in range(steps):
+            boards, policies, values = buffer.sample(batch_size)
+            _, policy_loss, value_loss = self.session.run(
+                [self.optimizer, self.policy_loss, self.value_loss],
+                feed_dict={self.input_layer: boards, self.target_policies: policies, self.target_values: values})
+            policy_losses.append(policy_loss)
+            value_losses.append(value_loss)
+
+        return float(np.mean(policy_losses)), float(np.mean(value_losses))
+
+    def close(self):
+        self.session.close()
+
+
+def train_alpha_zero(size, winning_length, hidden_layers, iterations, games_per_iteration, simulations, workers,
+                     buffer_capacity=100000, train_steps=200, batch_size=256, learning_rate=1e-3,
+                     evaluation_games=40, gate_threshold=0.55, leaves_per_tree=4, augment=True, metrics=None,
+                     weights_path=None):
+    """
+    Runs the self-play, training and evaluation loop.
+
+    Self-play always uses the best network so far. After every round of training the trained network plays a match
+    against the best one and replaces it when it scores at least `gate_threshold`. The best weights are published to
+    shared memory, self-play workers map them read only and switch to a new version at the start of their next task.
+
+    Args:
+        size: The size of the side of the board.
+        winning_length: The number of moves in a row needed for a win.
+        hidden_layers: Number of units in each of the shared hidden layers.
+        iterations: Number of self-play, training and evaluation rounds.
+        games_per_iteration: Number of self-play games per round.
+        simulations: Number of search simulations per move.
+        workers: Number of self-play processes, 1 plays in the current process.
+        buffer_capacity: Number of examples kept in the replay buffer.
+        train_steps: Number of optimizer steps per round.
+        batch_size: Number of examples per optimizer step.
+        learning_rate: Learning rate of the Adam optimizer.
+        evaluation_games: Number of games of the gating match.
+        gate_threshold: Minimal score of the trained network needed to become the best network.
+        leaves_per_tree: Number of leaves selected in each tree before a batched evaluation.
+        augment: Whether to add the rotations and reflections of the self-play examples.
+        metrics: Optional MetricsLogger.
+        weights_path: Optional .npz file the best weights are saved to after every round.
+
+    Returns:
+        list of np.array: Weights of the best network.
+    """
+    board_squares = size * size
+    search_options = dict(size=size, winning_length=winning_length, simulations=simulations,
+                          leaves_per_tree=leaves_per_tree)
+    store = SharedArrayStore('alpha_zero_weights_{}'.format(os.getpid()))
+    # the pool has to fork before the TensorFlow session starts its threads
+    pool = multiprocessing.Pool(workers, attach_shared_weights, (store.name, store.directory)) if workers > 1 else None
+    trainer = PolicyValueTrainer(board_squares, hidden_layers, learning_rate)
+    buffer = ReplayBuffer(buffer_capacity, board_squares)
+    best_weights = trainer.get_weights()
+    store.publish(best_weights)
+
+    try:
+        for iteration in range(1, iterations + 1):
+            start = time.time()
+            boards, visits, values = parallel_self_play(pool, None if pool else best_weights, games_per_iteration,
+                                                        workers, seed=iteration, **search_options)
+            self_play_seconds = time.time() - start
+            positions = len(values)
+            if augment:
+                boards, visits = dihedral_symmetries(boards, visits, size)
+                values = np.tile(values, 8)
+            buffer.add(boards, visits, values)
+
+            start = time.time()
+            policy_loss, value_loss = trainer.train(buffer, train_steps, batch_size)
+            train_seconds = time.time() - start
+
+            candidate_weights = trainer.get_weights()
+            score = play_match(candidate_weights, best_weights, evaluation_games, **search_options)
+            accepted = score >= gate_threshold
+            if accepted:
+                best_weights = candidate_weights
+                store.publish(best_weights)
+                if weights_path is not None:
+                    np.savez(weights_path, *best_weights)
+
+            print("iteration: %s positions: %s policy_loss: %.4f value_loss: %.4f score: %.3f accepted: %s" %
+                  (iteration, positions, policy_loss, value_loss, score, accepted))
+            if metrics is not None:
+                metrics.scalar('self_play/games_per_sec', games_per_iteration / self_play_seconds, iteration)
+                metrics.scalar('self_play/positions_per_sec', positions / self_play_seconds, iteration)
+                metrics.scalar('train/policy_loss', policy_loss, iteration)
+                metrics.scalar('train/value_loss', value_loss, iteration)
+                metrics.scalar('train/samples_per_sec', train_steps * batch_size / train_seconds, iteration)
+                metrics.scalar('gating/score', score, iteration)
+                metrics.scalar('gating/accepted', float(accepted), iteration)
+                metrics.histogram('self_play/values', values, iteration)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        trainer.close()
+        store.close()
+
+    return best_weights
+
+
+if __name__ == '__main__':
+    with create_metrics_logger('Graphs/alpha_zero') as metrics_logger:
+        train_alpha_zero(size=3,
+                         winning_length=3,
+                         hidden_layers=[128, 128],
+                         iterations=50,
+                         games_per_iteration=256,
+                         simulations=50,
+                         workers=multiprocessing.cpu_count(),
+                         metrics=metrics_logger,
+                         weights_path='alpha_zero_weights.npz')
@@ -0,0 +1,228 @@
+import math
+
+import numpy as np
+
+from game.tic_tac_toe import GameState
+
+VIRTUAL_LOSS = 1.
+
+
+class Node:
+    """Node of the search tree. Statistics of the children are kept in arrays indexed the same way as `moves`, child
+    nodes are created lazily when they are visited for the first time.
+
+    Values are stored from the perspective of the player making the move leading to the child.
+    """
+    __slots__ = ('moves', 'priors', 'visits', 'value_sums', 'children', 'total_visits')
+
+    def __init__(self):
+        self.moves = None
+        self.priors = None
+        self.visits = None
+        self.value_sums = None
+        self.children = {}
+        self.total_visits = 0
+
+    @property
+    def expanded(self):
+        return self.moves is not None
+
+    def expand(self, moves, priors):
+        self.moves = moves
+        self.priors = priors
+        self.visits = np.zeros(len(moves), dtype=np.int32)
+        self.value_sums = np.zeros(len(moves), dtype=np.float32)
+
+    def select(self, c_puct):
+        """Returns the index of the child maximizing the PUCT score."""
+        q = self.value_sums / np.maximum(self.visits, 1)
+        u = c_puct * math.sqrt(self.total_visits + 1) * self.priors / (1 + self.visits)
+        return int(np.argmax(q + u))
+
+    def child(self, index):
+        node = self.children.get(index)
+        if node is None:
+            node = self.children[index] = Node()
+        return node
+
+
+class SearchTree:
+    """Search tree rooted in the current position of one game.
+
+    Args:
+        size: The size of the side of the board.
+        winning_length: The number of moves in a row needed for a win.
+        board: Optional starting board, an empty board by default.
+        side_to_play: The side to make the next move, 1 for the first player, -1 for the second player.
+    """
+
+    def __init__(self, size, winning_length, board=None, side_to_play=1):
+        self.size = size
+        self.state = GameState(size, winning_length, board, side_to_play)
+        self.root = Node()
+
+    @property
+    def board(self):
+        return self.state.board
+
+    @property
+    def side_to_play(self):
+        return self.state.side_to_play
+
+    @property
+    def winner(self):
+        return self.state.winner
+
+    @property
+    def finished(self):
+        return self.state.finished
+
+    def advance(self, move_index):
+        """Plays the move given as a flat index and keeps the subtree below it for the next search."""
+        self.state.play(self.state.positions[move_index])
+
+        child = None
+        if self.root.expanded:
+            child = self.root.children.get(int(np.flatnonzero(self.root.moves == move_index)[0]))
+        self.root = child if child is not None else Node()
+
+    def add_exploration_noise(self, alpha, fraction):
+        noise = np.random.dirichlet([alpha] * len(self.root.moves))
+        self.root.priors = (1 - fraction) * self.root.priors + fraction * noise
+
+    def visit_counts(self):
+        """Returns the root visit counts spread over all squares of the board, as uint16 they fit searches of up to
+        65535 simulations."""
+        counts = np.zeros(self.size * self.size, dtype=np.uint16)
+        counts[self.root.moves] = self.root.visits
+        return counts
+
+    def visit_distribution(self):
+        """Returns the root visit counts spread over all squares of the board normalized to probabilities."""
+        return visit_policies(self.visit_counts()[np.newaxis])[0]
+
+    def select_leaf(self, c_puct):
+        """
+        Walks down the tree applying a virtual loss on the way, so that the next walk prefers a different path. The
+        moves are played on the game state of the tree and taken back before returning.
+
+        Returns:
+            Tuple (path, board, terminal_value), path is the list of (node, child index) pairs from the root, the board
+            is the flat position in the leaf seen from its side to play and terminal_value is the value of the finished
+            game for that side or None if the game goes on.
+        """
+        node = self.root
+        state = self.state
+        path = []
+        terminal_value = None
+
+        while node.expanded:
+            index = node.select(c_puct)
+            node.visits[index] += 1
+            node.value_sums[index] -= VIRTUAL_LOSS
+            node.total_visits += 1
+            path.append((node, index))
+
+            state.play(state.positions[node.moves[index]])
+            node = node.child(index)
+
+            if state.finished:
+                terminal_value = -1. if state.winner != 0 else 0.
+                break
+
+        board = state.board.ravel() * state.side_to_play
+        for _ in path:
+            state.undo()
+
+        return path, board, terminal_value
+
+    @staticmethod
+    def backup(path, value):
+        """Propagates the value of the leaf for its side to play up the path, removing the virtual losses."""
+        for node, index in reversed(path):
+            value = -value
+            node.value_sums[index] += value + VIRTUAL_LOSS
+
+
+def expand(node, board, priors):
+    """Expands the node with the legal moves of the board and their priors renormalized over legal moves only."""
+    moves = np.flatnonzero(board.ravel() == 0)
+    legal_priors = priors[moves]
+    total = legal_priors.sum()
+    if total > 0:
+        legal_priors = legal_priors / total
+    else:
+        legal_priors = np.full(len(moves), 1. / len(moves), dtype=np.float32)
+    node.expand(moves, legal_priors.astype(np.float32))
+
+
+def expand_roots(trees, evaluate):
+    """Expands the roots of all trees which were not expanded yet with a single batched evaluation."""
+    pending = [tree for tree in trees if not tree.root.expanded]
+    if pending:
+        boards = np.array([tree.board.ravel() * tree.side_to_play for tree in pending], dtype=np.float32)
+        priors, _ = evaluate(boards)
+        for tree, tree_priors in zip(pending, priors):
+            expand(tree.root, tree.board, tree_priors)
+
+
+def search(trees, evaluate, simulations, c_puct=1.5, leaves_per_tree=1):
+    """
+    Runs the simulations in all trees at once. In every round each tree selects up to `leaves_per_tree` leaves and all
+    the leaves from all the trees are evaluated with a single call of the network.
+
+    Args:
+        trees: SearchTrees of the games which are not finished.
+        evaluate: Function mapping a (N, squares) array of boards, seen from the side to play, to a tuple of
+            (N, squares) priors and (N,) values.
+        simulations: Number of simulations per tree.
+        c_puct: Exploration constant.
+        leaves_per_tree: Number of leaves selected in each tree before the batched evaluation.
+    """
+    expand_roots(trees, evaluate)
+    rounds = int(math.ceil(simulations / float(leaves_per_tree)))
+
+    for _ in range(rounds):
+        pending = []
+        for tree in trees:
+            for _ in range(leaves_per_tree):
+                path, board, terminal_value = tree.select_leaf(c_puct)
+                if terminal_value is None:
+                    pending.append((path, board))
+                else:
+                    tree.backup(path, terminal_value)
+
+        if not pending:
+            continue
+
+        boards = np.array([board for _, board in pending], dtype=np.float32)
+        priors, values = evaluate(boards)
+        for (path, board), leaf_priors, value in zip(pending, priors, values):
+            parent, index = path[-1]
+            leaf = parent.child(index)
+            if not leaf.expanded:
+                expand(leaf, board, leaf_priors)
+            SearchTree.backup(path, float(value))
+
+
+def visit_policies(visit_counts):
+    """Normalizes the visit counts of shape (N, squares) to move probabilities of float32."""
+    visit_counts = np.asarray(visit_counts, dtype=np.float32)
+    return visit_counts / np.maximum(visit_counts.sum(axis=1, keepdims=True), 1)
+
+
+def choose_move(tree, temperature=0.):
+    """
+    Returns the flat index of the move chosen from the visit counts of the root.
+
+    Args:
+        tree: SearchTree after the search.
+        temperature: 0 picks the most visited move, 1 samples proportionally to the visit counts.
+    """
+    visits = tree.root.visits
+    if temperature == 0:
+        return int(tree.root.moves[np.argmax(visits)])
+
+    probabilities = visits ** (1. / temperature)
+    probabilities = probabilities / probabilities.sum()
+    return int(np.random.choice(tree.root.moves, p=probabilities))
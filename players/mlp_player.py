@@ -1,13 +1,36 @@
 import numpy as np
 
-from keras.models import model_from_json
-
 from game.tic_tac_toe import available_moves, apply_move, clean_board
 
 
+def mlp_forward(weights, boards):
+    """Evaluates the dense relu network with a linear output in numpy, dropout is inactive during inference.
+
+    Args:
+        weights (list of np.array): Kernels and biases of the dense layers as returned by `model.get_weights()`.
+        boards (np.array): Boards of shape (N, 9).
+
+    Returns:
+        np.array: Evaluations of shape (N, 1).
+    """
+    last_layer = np.asarray(boards, dtype=np.float32)
+    for kernel, bias in zip(weights[:-2:2], weights[1:-2:2]):
+        last_layer = np.maximum(last_layer.dot(kernel) + bias, 0)
+    return last_layer.dot(weights[-2]) + weights[-1]
+
+
 class MlpPlayer:
-    def __init__(self, side_to_play):
-        self.model = self.load_model()
+    """Player choosing the move with the best evaluation of the resulting board.
+
+    Args:
+        side_to_play: The side of the player, 1 for the first player, -1 for the second player.
+        weights: Optional weights of the model, e.g. the arrays of a `utils.shared_arrays.SharedArrayView`, evaluated in
+            numpy without loading Keras. By default the Keras model is loaded from disk.
+    """
+
+    def __init__(self, side_to_play, weights=None):
+        self.weights = weights
+        self.model = self.load_model() if weights is None else None
         self.side_to_play = side_to_play
 
     def min_max_best_move(self, evaluations):
@@ -21,12 +44,17 @@ class MlpPlayer:
         new_boards = np.array([apply_move(board, move, self.side_to_play) for move in legal_moves])
         # print(new_boards.reshape(len(legal_moves), 9))
         # possible_boards = [apply_move(board, move, self.side_to_play) for move in legal_moves]
-        evaluations = self.model.predict(new_boards.reshape(len(legal_moves), 9))
+        if self.weights is None:
+            evaluations = self.model.predict(new_boards.reshape(len(legal_moves), 9))
+        else:
+            evaluations = mlp_forward(self.weights, new_boards.reshape(len(legal_moves), 9))
         print(legal_moves)
         print(evaluations)
         return legal_moves[self.min_max_best_move(evaluations)]
 
     def load_model(self):
+        from keras.models import model_from_json
+
         json_file = open('model.json', 'r')
         loaded_model_json = json_file.read()
         json_file.close()
@@ -1,5 +1,6 @@
 import collections
 import random
+import time
 
 import numpy as np
 import tensorflow as tf
@@ -7,57 +8,126 @@ import tensorflow as tf
 # from game.tic_tac_toe import flat_move_to_tuple
 from game.tic_tac_toe import flat_move_to_tuple, playya_game
 from players.random_player import RandomPlayer
+from utils.metrics import create_metrics_logger, result_rates
 from utils.network_utils import create_network, get_deterministic_network_move
 
 
-def train_policy_gradients(layers, learning_rate, games, log_every, winning_length, opponent, batch_size):
-    reward_tf = tf.placeholder(tf.float32, shape=(None,))
-    actual_move = tf.placeholder(tf.float32, shape=(None, 9))
-
-    input_layer, output_layer, variables = create_network(layers)
-    policy_gradient = -tf.log(tf.reduce_sum(tf.multiply(actual_move, output_layer), reduction_indices=1)) * reward_tf
-    optimizer = tf.train.AdamOptimizer(learning_rate).minimize(policy_gradient)
-
-    with tf.Session() as session:
+def train_policy_gradients(layers, learning_rate, games, log_every, winning_length, opponent, batch_size,
+                           metrics=None, discount=0.9, baseline=True, value_loss_weight=0.5, threads=0, callback=None):
+    """Trains the policy network with REINFORCE against the given opponent.
+
+    Every move of a game is credited with the final result discounted by the number of moves left until the end of the
+    game. With the baseline enabled a value head is trained on these returns and subtracted from them, the resulting
+    advantages are normalized once per batch inside the graph.
+
+    Args:
+        layers (list of int): Number of units in the input, hidden and output layers.
+        learning_rate (float): Learning rate of the Adam optimizer.
+        games (int): Number of games to play.
+        log_every (int): Number of games between printed and logged results.
+        winning_length (int): The number of moves in a row needed for a win.
+        opponent: Player with the `get_move(board, side)` method.
+        batch_size (int): Number of games per training batch.
+        metrics (MetricsLogger): Optional logger for results, speed and loss.
+        discount (float): Discount applied per move between the move and the end of the game.
+        baseline (bool): Whether to subtract the value head estimate from the returns.
+        value_loss_weight (float): Weight of the value head loss.
+        threads (int): Number of TensorFlow intra-op threads, 0 lets TensorFlow decide.
+        callback: Optional function called every `log_every` games with the episode number and the recent win rate,
+            training stops when it returns True.
+    """
+    board_squares = layers[0]
+    returns_tf = tf.placeholder(tf.float32, shape=(None,))
+    actual_move = tf.placeholder(tf.float32, shape=(None, board_squares))
+
+    if baseline:
+        input_layer, output_layer, variables, value_layer = create_network(layers, value_head=True)
+        values = tf.squeeze(value_layer, axis=1)
+        advantages = returns_tf - tf.stop_gradient(values)
+        value_loss = tf.reduce_sum(tf.square(returns_tf - values))
+    else:
+        input_layer, output_layer, variables = create_network(layers)
+        advantages = returns_tf
+        value_loss = tf.constant(0.)
+
+    mean, variance = tf.nn.moments(advantages, axes=[0])
+    normalized_advantages = (advantages - mean) / (tf.sqrt(variance) + 1e-8)
+    policy_gradient = -tf.log(tf.reduce_sum(tf.multiply(actual_move, output_layer), axis=1)) * normalized_advantages
+    total_loss = tf.reduce_sum(policy_gradient) + value_loss_weight * value_loss
+    loss = tf.reduce_mean(policy_gradient)
+    optimizer = tf.train.AdamOptimizer(learning_rate).minimize(total_loss)
+
+    # a player makes at most board_squares moves in a game, so the buffers never overflow within a batch
+    capacity = batch_size * board_squares
+    boards_buffer = np.zeros((capacity, board_squares), dtype=np.float32)
+    moves_buffer = np.zeros((capacity, board_squares), dtype=np.float32)
+    returns_buffer = np.zeros(capacity, dtype=np.float32)
+    discounts = discount ** np.arange(board_squares - 1, -1, -1, dtype=np.float32)
+
+    config = tf.ConfigProto(intra_op_parallelism_threads=threads, inter_op_parallelism_threads=1 if threads else 0)
+    with tf.Session(config=config) as session:
         session.run(tf.global_variables_initializer())
-        boards_batch, moves_batch, rewards_batch = [], [], []
+        samples = 0
         results = collections.deque(maxlen=log_every)
+        illegal_moves = 0
+        log_start, log_samples = time.time(), 0
 
         def training_move(board, side):
-            boards_batch.append(np.ravel(board) * side)
+            nonlocal samples, illegal_moves
+            np.multiply(np.ravel(board), side, out=boards_buffer[samples])
             move = get_deterministic_network_move(session, input_layer, output_layer, board, side)
-            moves_batch.append(move)
+            moves_buffer[samples] = move
+            samples += 1
 
-            return flat_move_to_tuple(board, move.argmax())
+            move_index = move.argmax()
+            if board.flat[move_index] != 0:
+                illegal_moves += 1
+            return flat_move_to_tuple(board, move_index)
 
         for episode_number in range(1, games):
+            game_start = samples
             # randomize if going first or second
             if bool(random.getrandbits(1)):
-                # print("Starts MLP with 1")
-                reward = playya_game(3, training_move, opponent.get_move)
+                reward = playya_game(3, training_move, opponent.get_move, winning_length=winning_length)
             else:
-                # print("Starts Random with 1")
-                reward = -playya_game(3, opponent.get_move, training_move)
+                reward = -playya_game(3, opponent.get_move, training_move, winning_length=winning_length)
 
             results.append(reward)
-            last_game_length = len(boards_batch) - len(rewards_batch)
-            reward /= float(last_game_length)
-
-            rewards_batch += ([reward] * last_game_length)
+            game_length = samples - game_start
+            np.multiply(discounts[board_squares - game_length:], reward, out=returns_buffer[game_start:samples])
+            log_samples += game_length
 
             if episode_number % batch_size == 0:
-                normalized_rewards = normalize_rewards(rewards_batch)
-
-                np_mini_batch_board_states = np.array(boards_batch).reshape(len(rewards_batch),
-                                                                            *input_layer.get_shape().as_list()[1:])
-
-                session.run(optimizer, feed_dict={input_layer: np_mini_batch_board_states,
-                                                  reward_tf: normalized_rewards,
-                                                  actual_move: moves_batch})
-
-                boards_batch, moves_batch, rewards_batch = [], [], []
+                batch_start = time.time()
+                _, batch_loss, batch_advantages = session.run(
+                    [optimizer, loss, normalized_advantages],
+                    feed_dict={input_layer: boards_buffer[:samples],
+                               returns_tf: returns_buffer[:samples],
+                               actual_move: moves_buffer[:samples]})
+                if metrics is not None:
+                    metrics.scalar('train/loss', batch_loss, episode_number)
+                    metrics.scalar('speed/batch_seconds', time.time() - batch_start, episode_number)
+                    metrics.histogram('train/normalized_advantages', batch_advantages, episode_number)
+
+                samples = 0
             if episode_number % log_every == 0:
                 print("episode: %s win_rate: %s" % (episode_number, _win_rate(log_every, results)))
+                if metrics is not None:
+                    elapsed = time.time() - log_start
+                    _log_results(metrics, episode_number, results, elapsed, log_samples, illegal_moves)
+                log_start, log_samples, illegal_moves = time.time(), 0, 0
+                if callback is not None and callback(episode_number, result_rates(results)[0]):
+                    break
+
+
+def _log_results(metrics, step, results, elapsed, samples, illegal_moves):
+    win_rate, draw_rate, loss_rate = result_rates(results)
+    metrics.scalar('results/win_rate', win_rate, step)
+    metrics.scalar('results/draw_rate', draw_rate, step)
+    metrics.scalar('results/loss_rate', loss_rate, step)
+    metrics.scalar('results/illegal_move_rate', illegal_moves / float(max(len(results), 1)), step)
+    metrics.scalar('speed/episodes_per_sec', len(results) / max(elapsed, 1e-9), step)
+    metrics.scalar('speed/samples_per_sec', samples / max(elapsed, 1e-9), step)
 
 
 def _win_rate(print_results_every, results):
@@ -66,21 +136,13 @@ def _win_rate(print_results_every, results):
     return 0.5 + i / every___
 
 
-def normalize_rewards(rewards_batch):
-    normalized_rewards = rewards_batch - np.mean(rewards_batch)
-    rewards_std = np.std(normalized_rewards)
-    if rewards_std != 0:
-        normalized_rewards /= rewards_std
-    else:
-        print("warning: got mini batch std of 0.")
-    return normalized_rewards
-
-
 if __name__ == '__main__':
-    train_policy_gradients(layers=[9, 100, 100, 100, 9],
-                           learning_rate=1e-4,
-                           batch_size=100,
-                           games=100000,
-                           log_every=1000,
-                           opponent=RandomPlayer(-1),
-                           winning_length=3)
+    with create_metrics_logger('Graphs/policy_gradient') as metrics_logger:
+        train_policy_gradients(layers=[9, 100, 100, 100, 9],
+                               learning_rate=1e-4,
+                               batch_size=100,
+                               games=100000,
+                               log_every=1000,
+                               opponent=RandomPlayer(-1),
+                               winning_length=3,
+                               metrics=metrics_logger)
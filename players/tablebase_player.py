@@ -0,0 +1,40 @@
+import numpy as np
+
+from game.tablebase import Tablebase
+from game.tic_tac_toe import apply_move, clean_board, determine_board_winner
+from players.random_player import RandomPlayer
+
+
+class TablebasePlayer:
+    """Perfect player looking its moves up in a solved `game.tablebase.Tablebase`. It wins as fast as possible, draws
+    when it can not win and defends as long as possible when it can not draw.
+
+    Args:
+        side: The side of the player, 1 for the first player, -1 for the second player.
+        tablebase: Tablebase of the game played.
+    """
+
+    def __init__(self, side, tablebase):
+        self.side = side
+        self.tablebase = tablebase
+
+    def get_move(self, board, side=None):
+        return self.tablebase.best_move(board)
+
+
+if __name__ == '__main__':
+    tablebase = Tablebase.load_or_solve(3, 3)
+    results = {1: 0, 0: 0, -1: 0}
+    for game in range(1000):
+        players = {1: TablebasePlayer(1, tablebase), -1: RandomPlayer(-1)}
+        if game % 2:
+            players = {1: RandomPlayer(1), -1: TablebasePlayer(-1, tablebase)}
+        board = clean_board(3)
+        side = 1
+        while determine_board_winner(board, 3) == 0 and np.any(board == 0):
+            board = apply_move(board, players[side].get_move(board, side), side)
+            side = -side
+        perfect_side = 1 if game % 2 == 0 else -1
+        results[determine_board_winner(board, 3) * perfect_side] += 1
+    print("tablebase player against random player, wins: %s draws: %s losses: %s" % (results[1], results[0],
+                                                                                      results[-1]))
@@ -0,0 +1,220 @@
+import csv
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+
+class MetricsLogger:
+    """Buffers scalars and histograms in memory and flushes them to the sinks on a background thread.
+
+    Recording a value only appends a tuple to a list, so it is cheap enough to be called from the training loop.
+    Formatting and writing to disk happens on the writer thread, which receives whole buffers at a time.
+
+    Args:
+        sinks: Objects with `write(records)`, `flush()` and `close()` methods, e.g. `CsvSink`, `JsonlSink` or
+            `TensorBoardSink`.
+        flush_every: Number of buffered records after which the buffer is handed to the writer thread.
+        flush_secs: Maximum number of seconds a record can stay in the buffer.
+    """
+
+    def __init__(self, sinks, flush_every=1000, flush_secs=10.):
+        self.sinks = list(sinks)
+        self.flush_every = flush_every
+        self.flush_secs = flush_secs
+        self._buffer = []
+        self._last_flush = time.time()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._write_loop, name='metrics-writer', daemon=True)
+        self._thread.start()
+
+    def scalar(self, tag, value, step):
+        self._record('scalar', tag, float(value), step)
+
+    def histogram(self, tag, values, step):
+        self._record('histogram', tag, np.array(values, dtype=np.float64).ravel(), step)
+
+    def _record(self, kind, tag, value, step):
+        wall_time = time.time()
+        self._buffer.append((kind, tag, value, int(step), wall_time))
+        if len(self._buffer) >= self.flush_every or wall_time - self._last_flush >= self.flush_secs:
+            self.flush()
+
+    def flush(self):
+        """Hands the buffered records over to the writer thread without waiting for them to be written."""
+        if self._buffer:
+            self._queue.put(self._buffer)
+            self._buffer = []
+        self._last_flush = time.time()
+
+    def close(self):
+        """Flushes the remaining records, waits for the writer thread and closes all sinks."""
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
+        for sink in self.sinks:
+            sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _write_loop(self):
+        while True:
+            records = self._queue.get()
+            if records is None:
+                return
+            for sink in self.sinks:
+                sink.write(records)
+                sink.flush()
+
+
+def histogram_buckets(values, bins=30):
+    """
+    Returns the histogram of the given values.
+
+    Args:
+        values: One dimensional numpy array of values.
+        bins: Number of buckets of the histogram.
+
+    Returns:
+        Tuple of numpy arrays (counts, edges), edges has one element more than counts.
+    """
+    if values.size == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(1)
+    return np.histogram(values, bins=bins)
+
+
+class CsvSink:
+    """Writes records as `wall_time,step,tag,value` rows. Histograms are reduced to their mean, std, min and max."""
+
+    def __init__(self, path):
+        self._file = open(path, 'a', newline='')
+        self._writer = csv.writer(self._file)
+        if self._file.tell() == 0:
+            self._writer.writerow(['wall_time', 'step', 'tag', 'value'])
+
+    def write(self, records):
+        for kind, tag, value, step, wall_time in records:
+            if kind == 'scalar':
+                self._writer.writerow([wall_time, step, tag, value])
+            elif value.size > 0:
+                for statistic in ('mean', 'std', 'min', 'max'):
+                    self._writer.writerow([wall_time, step, '{}/{}'.format(tag, statistic),
+                                           float(getattr(value, statistic)())])
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlSink:
+    """Writes one JSON object per record. Histograms are stored as bucket counts and edges."""
+
+    def __init__(self, path, bins=30):
+        self.bins = bins
+        self._file = open(path, 'a')
+
+    def write(self, records):
+        for kind, tag, value, step, wall_time in records:
+            record = {'wall_time': wall_time, 'step': step, 'tag': tag, 'kind': kind}
+            if kind == 'scalar':
+                record['value'] = value
+            else:
+                counts, edges = histogram_buckets(value, self.bins)
+                record['counts'] = counts.tolist()
+                record['edges'] = edges.tolist()
+            self._file.write(json.dumps(record) + '\n')
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class TensorBoardSink:
+    """Writes records into TensorBoard event files in the given directory."""
+
+    def __init__(self, logdir, bins=30):
+        import tensorflow as tf
+
+        self._tf = tf
+        self.bins = bins
+        self._writer = tf.summary.FileWriter(logdir)
+
+    def write(self, records):
+        tf = self._tf
+        for kind, tag, value, step, wall_time in records:
+            if kind == 'scalar':
+                summary_value = tf.Summary.Value(tag=tag, simple_value=value)
+            else:
+                summary_value = tf.Summary.Value(tag=tag, histo=self._histogram_proto(value))
+            self._writer.add_event(tf.Event(wall_time=wall_time, step=step, summary=tf.Summary(value=[summary_value])))
+
+    def _histogram_proto(self, values):
+        counts, edges = histogram_buckets(values, self.bins)
+        histogram = self._tf.HistogramProto()
+        if values.size > 0:
+            histogram.min = float(values.min())
+            histogram.max = float(values.max())
+            histogram.num = int(values.size)
+            histogram.sum = float(values.sum())
+            histogram.sum_squares = float(np.sum(values ** 2))
+        histogram.bucket_limit.extend(edges[1:].tolist())
+        histogram.bucket.extend(counts.tolist())
+        return histogram
+
+    def flush(self):
+        self._writer.flush()
+
+    def close(self):
+        self._writer.close()
+
+
+def create_metrics_logger(logdir, tensorboard=True, csv_file='metrics.csv', jsonl_file='metrics.jsonl', **kwargs):
+    """
+    Returns a metrics logger writing TensorBoard events, CSV and JSONL files into the given directory.
+
+    Args:
+        logdir: Directory for all the outputs, created if it does not exist.
+        tensorboard: Whether to write TensorBoard event files.
+        csv_file: Name of the CSV file or None to disable it.
+        jsonl_file: Name of the JSONL file or None to disable it.
+        **kwargs: Passed to the MetricsLogger.
+
+    Returns:
+        MetricsLogger writing to the selected sinks.
+    """
+    os.makedirs(logdir, exist_ok=True)
+    sinks = []
+    if tensorboard:
+        sinks.append(TensorBoardSink(logdir))
+    if csv_file:
+        sinks.append(CsvSink(os.path.join(logdir, csv_file)))
+    if jsonl_file:
+        sinks.append(JsonlSink(os.path.join(logdir, jsonl_file)))
+    return MetricsLogger(sinks, **kwargs)
+
+
+def result_rates(results):
+    """
+    Returns rates of wins, draws and losses in the given results.
+
+    Args:
+        results: Collection of game results, 1 for a win, 0 for a draw and -1 for a loss.
+
+    Returns:
+        Tuple (win_rate, draw_rate, loss_rate).
+    """
+    games = float(max(len(results), 1))
+    wins = sum(1 for result in results if result > 0)
+    losses = sum(1 for result in results if result < 0)
+    return wins / games, (len(results) - wins - losses) / games, losses / games
@@ -2,13 +2,22 @@ import tensorflow as tf
 import numpy as np
 
 
-def create_network(layers):
+def create_network(layers, value_head=False):
+    """Creates the policy network, optionally with a value head used as the baseline for policy gradients.
+
+    Args:
+        layers (list of int): Number of units in the input, hidden and output layers.
+        value_head (bool): Whether to add a single tanh unit estimating the value of the board on top of the last
+            hidden layer.
+
+    Returns:
+        (input_layer, output_layer, variables) or (input_layer, output_layer, variables, value_layer) if the value
+        head was requested, value_layer has shape (None, 1).
+    """
     inputs = layers[0]
-    hidden = layers[:1: -1]
+    hidden = layers[1:-1]
     outputs = layers[-1]
     variables = []
-    last_layer = None
-    last_layer_units = None
 
     with tf.name_scope('network'):
         input_layer = tf.placeholder(dtype=tf.float32, shape=(None, inputs))
@@ -24,6 +33,7 @@ def create_network(layers):
 
             last_layer = tf.nn.relu(tf.matmul(last_layer, hidden_weights) + hidden_bias)
 
+        last_layer_units = int(last_layer.get_shape()[-1])
         output_weights = tf.Variable(initialize_weights(outputs, last_layer_units), name="output_weights")
         output_bias = tf.Variable(initialize_bias(outputs), name="output_bias")
 
@@ -32,9 +42,61 @@ def create_network(layers):
 
         output_layer = tf.nn.softmax(tf.matmul(last_layer, output_weights) + output_bias)
 
+        if value_head:
+            value_weights = tf.Variable(initialize_weights(1, last_layer_units), name="value_weights")
+            value_bias = tf.Variable(initialize_bias(1), name="value_bias")
+
+            variables.append(value_weights)
+            variables.append(value_bias)
+
+            value_layer = tf.nn.tanh(tf.matmul(last_layer, value_weights) + value_bias)
+            return input_layer, output_layer, variables, value_layer
+
     return input_layer, output_layer, variables
 
 
+def create_policy_value_network(board_squares, hidden_layers):
+    """Creates the two-headed network used by the AlphaZero player.
+
+    Args:
+        board_squares (int): Number of squares of the board, the size of the input and of the policy head.
+        hidden_layers (list of int): Number of units in each of the shared hidden layers.
+
+    Returns:
+        (input_layer, policy_logits, value_layer, variables), value_layer has shape (None, 1) and values in [-1, 1].
+        The variables are ordered the same way as the weights expected by
+        `players.alpha_zero.policy_value_forward`.
+    """
+    variables = []
+
+    with tf.name_scope('policy_value_network'):
+        input_layer = tf.placeholder(dtype=tf.float32, shape=(None, board_squares))
+        last_layer = input_layer
+
+        for hidden_units in hidden_layers:
+            last_layer_units = int(last_layer.get_shape()[-1])
+            hidden_weights = tf.Variable(initialize_weights(hidden_units, last_layer_units), name='weights')
+            hidden_bias = tf.Variable(initialize_bias(hidden_units), name='biases')
+
+            variables.append(hidden_weights)
+            variables.append(hidden_bias)
+
+            last_layer = tf.nn.relu(tf.matmul(last_layer, hidden_weights) + hidden_bias)
+
+        last_layer_units = int(last_layer.get_shape()[-1])
+        policy_weights = tf.Variable(initialize_weights(board_squares, last_layer_units), name='policy_weights')
+        policy_bias = tf.Variable(initialize_bias(board_squares), name='policy_bias')
+        value_weights = tf.Variable(initialize_weights(1, last_layer_units), name='value_weights')
+        value_bias = tf.Variable(initialize_bias(1), name='value_bias')
+
+        variables.extend([policy_weights, policy_bias, value_weights, value_bias])
+
+        policy_logits = tf.matmul(last_layer, policy_weights) + policy_bias
+        value_layer = tf.nn.tanh(tf.matmul(last_layer, value_weights) + value_bias)
+
+    return input_layer, policy_logits, value_layer, variables
+
+
 def initialize_bias(units):
     return tf.constant(0.01, shape=(units,))
 
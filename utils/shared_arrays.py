@@ -0,0 +1,191 @@
+import json
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+
+def default_directory():
+    """Returns /dev/shm when it exists, so that the arrays live in memory, otherwise the temporary directory."""
+    return '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+
+class SharedArrayStore:
+    """Publishes versions of a list of arrays, e.g. network weights or a Q table, as memory mapped .npy files.
+
+    Every version is written once into its own directory and becomes visible to readers only after the version file is
+    atomically replaced, so readers never see a half written version. Old versions are removed from the file system but
+    stay mapped in the readers still using them.
+
+    Args:
+        name: Name of the store, readers attach to it with `SharedArrayView(name, directory)`.
+        directory: Directory of the store, `default_directory()` by default.
+        keep: Number of the newest versions kept on the file system.
+    """
+
+    def __init__(self, name, directory=None, keep=2):
+        self.name = name
+        self.directory = directory or default_directory()
+        self.keep = keep
+        self.version = 0
+        self.path = os.path.join(self.directory, name)
+        os.makedirs(self.path)
+
+    def publish(self, arrays):
+        """
+        Writes the arrays as a new version.
+
+        Args:
+            arrays: List of numpy arrays.
+
+        Returns:
+            int: The published version.
+        """
+        version = self.version + 1
+        staging = os.path.join(self.path, '.staging-{}'.format(version))
+        os.makedirs(staging)
+        for index, array in enumerate(arrays):
+            np.save(os.path.join(staging, '{}.npy'.format(index)), np.ascontiguousarray(array))
+        with open(os.path.join(staging, 'manifest.json'), 'w') as manifest:
+            json.dump({'arrays': len(arrays)}, manifest)
+        os.rename(staging, os.path.join(self.path, str(version)))
+
+        _write_atomically(os.path.join(self.path, 'version'), str(version))
+        self.version = version
+
+        stale = os.path.join(self.path, str(version - self.keep))
+        if os.path.isdir(stale):
+            shutil.rmtree(stale)
+        return version
+
+    def close(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class SharedArrayView:
+    """Read only, zero-copy view of the newest version published to a SharedArrayStore.
+
+    The arrays are memory mapped, so all the processes attached to the same version share the same physical pages.
+    Call `refresh` to switch to a newer version without restarting the process.
+
+    Args:
+        name: Name of the store.
+        directory: Directory of the store, `default_directory()` by default.
+    """
+
+    def __init__(self, name, directory=None):
+        self.path = os.path.join(directory or default_directory(), name)
+        self.version = None
+        self.arrays = None
+        self.refresh()
+
+    def refresh(self):
+        """
+        Attaches to the newest version if it differs from the current one.
+
+        Returns:
+            bool: True if the arrays have changed, False also when nothing has been published yet.
+        """
+        for _ in range(10):
+            try:
+                with open(os.path.join(self.path, 'version')) as version_file:
+                    version = int(version_file.read())
+            except FileNotFoundError:
+                return False
+            if version == self.version:
+                return False
+            try:
+                self.arrays = self._attach(version)
+                self.version = version
+                return True
+            except FileNotFoundError:
+                # the version was removed while attaching, a newer one is already published
+                continue
+        raise RuntimeError("Could not attach to {}, versions are published too fast".format(self.path))
+
+    def _attach(self, version):
+        version_path = os.path.join(self.path, str(version))
+        with open(os.path.join(version_path, 'manifest.json')) as manifest:
+            arrays = json.load(manifest)['arrays']
+        return [np.load(os.path.join(version_path, '{}.npy'.format(index)), mmap_mode='r') for index in range(arrays)]
+
+
+def _write_atomically(path, content):
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as file:
+        file.write(content)
+    os.replace(temporary, path)
+
+
+def memory_usage():
+    """Returns the resident and proportional set sizes of the current process in bytes, PSS splits shared pages
+    between the processes mapping them. PSS is 0 where /proc/self/smaps_rollup is not available."""
+    usage = {'Rss': 0, 'Pss': 0}
+    try:
+        with open('/proc/self/smaps_rollup') as smaps:
+            for line in smaps:
+                key, _, value = line.partition(':')
+                if key in usage:
+                    usage[key] = int(value.split()[0]) * 1024
+    except IOError:
+        import resource
+        usage['Rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return usage['Rss'], usage['Pss']
+
+
+def _pickled_worker(path, started, results):
+    with open(path, 'rb') as file:
+        arrays = pickle.load(file)
+    _report(arrays, started, results)
+
+
+def _shared_worker(name, directory, started, results):
+    arrays = SharedArrayView(name, directory).arrays
+    _report(arrays, started, results)
+
+
+def _report(arrays, started, results):
+    checksum = sum(float(array.sum()) for array in arrays)
+    results.put((time.time() - started, checksum) + memory_usage())
+    time.sleep(1.)
+
+
+def _measure(workers, target, args):
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    processes = [context.Process(target=target, args=args + (time.time(), results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    startup, _, rss, pss = (np.mean(column) for column in zip(*reports))
+    return startup, rss, pss
+
+
+if __name__ == '__main__':
+    arrays = [np.random.rand(2048, 2048).astype(np.float32) for _ in range(4)]
+    print("payload: %.0f MB" % (sum(array.nbytes for array in arrays) / 2. ** 20))
+
+    with SharedArrayStore('shared_arrays_benchmark') as store:
+        store.publish(arrays)
+        pickled_path = os.path.join(store.path, 'arrays.pkl')
+        with open(pickled_path, 'wb') as handle:
+            pickle.dump(arrays, handle)
+
+        for workers in (1, 8, 32):
+            for mode, target, args in (('pickle', _pickled_worker, (pickled_path,)),
+                                       ('shared', _shared_worker, (store.name, store.directory))):
+                startup, rss, pss = _measure(workers, target, args)
+                print("workers: %2d mode: %s startup: %.3fs rss: %.0f MB pss: %.0f MB" %
+                      (workers, mode, startup, rss / 2. ** 20, pss / 2. ** 20))
@@ -0,0 +1,290 @@
+import contextlib
+import csv
+import itertools
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+import traceback
+
+import numpy as np
+
+# read by OpenMP, MKL, OpenBLAS and TensorFlow when they start their thread pools, a spawned worker imports numpy while
+# unpickling its initializer, so they have to be in the environment before the pool starts the workers
+THREAD_VARIABLES = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS',
+                    'TF_NUM_INTEROP_THREADS')
+
+Q_LEARNING_DEFAULTS = {'learning_rate': 0.3, 'discount': 0.9, 'games': 10000, 'log_every': 1000, 'winning_length': 3}
+POLICY_GRADIENT_DEFAULTS = {'layers': [9, 100, 100, 100, 9], 'learning_rate': 1e-4, 'batch_size': 100,
+                            'games': 100000, 'log_every': 1000, 'winning_length': 3}
+
+
+def grid_search(space):
+    """
+    Returns all combinations of the values.
+
+    Args:
+        space: Dict mapping the name of a setting to the list of its values.
+
+    Returns:
+        list of dict: Configurations.
+    """
+    names = sorted(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_search(space, trials, seed=0):
+    """
+    Returns configurations with randomly sampled values.
+
+    Args:
+        space: Dict mapping the name of a setting to a list of values sampled uniformly or to a (low, high) tuple.
+            Integer bounds are sampled uniformly, float bounds log-uniformly.
+        trials: Number of configurations.
+        seed: Seed of the sampling.
+
+    Returns:
+        list of dict: Configurations.
+    """
+    random_state = random.Random(seed)
+    configs = []
+    for _ in range(trials):
+        config = {}
+        for name in sorted(space):
+            values = space[name]
+            if isinstance(values, list):
+                config[name] = random_state.choice(values)
+            elif all(isinstance(bound, int) for bound in values):
+                config[name] = random_state.randint(*values)
+            else:
+                config[name] = math.exp(random_state.uniform(math.log(values[0]), math.log(values[1])))
+        configs.append(config)
+    return configs
+
+
+class MedianStoppingRule:
+    """Stops a trial when its average win rate so far is below the median of the average win rates of the other trials
+    up to the same episode.
+
+    Args:
+        reports: Dict shared between the processes, e.g. `multiprocessing.Manager().dict()`, mapping the trial to the
+            list of its (episode, win rate) reports.
+        grace_episodes: Number of episodes before a trial can be stopped.
+        min_trials: Number of other trials which have to reach the episode before a trial can be stopped.
+    """
+
+    def __init__(self, reports, grace_episodes=0, min_trials=3):
+        self.reports = reports
+        self.grace_episodes = grace_episodes
+        self.min_trials = min_trials
+
+    def should_stop(self, trial, episode, win_rate):
+        history = self.reports.get(trial, []) + [(episode, win_rate)]
+        self.reports[trial] = history
+        if episode < self.grace_episodes:
+            return False
+
+        averages = [_average_until(other, episode) for key, other in self.reports.items()
+                    if key != trial and other[-1][0] >= episode]
+        if len(averages) < self.min_trials:
+            return False
+        return _average_until(history, episode) < np.median(averages)
+
+
+def _average_until(history, episode):
+    return np.mean([win_rate for step, win_rate in history if step <= episode])
+
+
+def q_learning_trial(config, callback, threads):
+    """Trains a QPlayer against the random player, see `Q_LEARNING_DEFAULTS` for the settings."""
+    from players.QPlayer import QPlayer, train_q_player
+    from players.random_player import RandomPlayer
+
+    config = dict(Q_LEARNING_DEFAULTS, **config)
+    qplayer = QPlayer(1, config['winning_length'], config['learning_rate'], config['discount'])
+    train_q_player(qplayer, RandomPlayer(-1), config['games'], config['winning_length'],
+                   log_every=config['log_every'], callback=callback)
+
+
+def policy_gradient_trial(config, callback, threads):
+    """Trains the policy network against the random player, see `POLICY_GRADIENT_DEFAULTS` for the settings."""
+    import tensorflow as tf
+    from players.policy_gradient import train_policy_gradients
+    from players.random_player import RandomPlayer
+
+    config = dict(POLICY_GRADIENT_DEFAULTS, **config)
+    with tf.Graph().as_default():
+        train_policy_gradients(layers=list(config['layers']),
+                               learning_rate=config['learning_rate'],
+                               games=config['games'],
+                               log_every=config['log_every'],
+                               winning_length=config['winning_length'],
+                               opponent=RandomPlayer(-1),
+                               batch_size=config['batch_size'],
+                               threads=threads,
+                               callback=callback)
+
+
+def cpu_groups(threads_per_trial):
+    """Splits the CPUs available to the process into disjoint groups of `threads_per_trial` CPUs, or returns one group
+    of all the CPUs when there are fewer."""
+    if hasattr(os, 'sched_getaffinity'):
+        cpus = sorted(os.sched_getaffinity(0))
+    else:
+        cpus = list(range(os.cpu_count()))
+    groups = [cpus[i:i + threads_per_trial] for i in range(0, len(cpus) - threads_per_trial + 1, threads_per_trial)]
+    return groups or [cpus]
+
+
+@contextlib.contextmanager
+def _thread_limits(threads):
+    """Limits the thread pools of the processes started inside the context to the given number of threads."""
+    previous = {variable: os.environ.get(variable) for variable in THREAD_VARIABLES}
+    os.environ.update({variable: str(threads) for variable in THREAD_VARIABLES})
+    try:
+        yield
+    finally:
+        for variable, value in previous.items():
+            if value is None:
+                os.environ.pop(variable, None)
+            else:
+                os.environ[variable] = value
+
+
+def _pin_worker(groups):
+    cpus = groups.get()
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+
+
+def _run_trial(arguments):
+    trial, trial_id, config, threads, stopping_rule = arguments
+    random.seed(trial_id)
+    np.random.seed(trial_id)
+    reports = []
+    stopped = []
+
+    def callback(episode, win_rate):
+        reports.append((episode, win_rate))
+        if stopping_rule is not None and stopping_rule.should_stop(trial_id, episode, win_rate):
+            stopped.append(episode)
+            return True
+        return False
+
+    start, cpu_start = time.time(), time.process_time()
+    error = ''
+    try:
+        trial(config, callback, threads)
+    except Exception as exception:
+        # a failing configuration is reported in its row instead of aborting the whole sweep
+        error = ''.join(traceback.format_exception_only(type(exception), exception)).strip()
+    result = {'trial': trial_id}
+    result.update(config)
+    result.update({'win_rate': reports[-1][1] if reports else float('nan'),
+                   'best_win_rate': max(win_rate for _, win_rate in reports) if reports else float('nan'),
+                   'episodes': reports[-1][0] if reports else 0,
+                   'stopped_early': bool(stopped),
+                   'seconds': time.time() - start,
+                   'cpu_seconds': time.process_time() - cpu_start,
+                   'error': error})
+    return result
+
+
+def run_sweep(trial, configs, threads_per_trial=1, workers=None, grace_episodes=0, min_trials=3, early_stopping=True,
+              csv_file=None):
+    """
+    Runs the trials in a pool of processes, every process is pinned to its own group of CPUs and its thread pools are
+    limited to the size of the group, so parallel trials do not oversubscribe the CPUs.
+
+    Args:
+        trial: Function called with the configuration, the callback for intermediate win rates and the number of
+            threads, e.g. `q_learning_trial` or `policy_gradient_trial`.
+        configs: List of configurations, e.g. from `grid_search` or `random_search`.
+        threads_per_trial: Number of CPUs of every trial.
+        workers: Number of trials run in parallel, all the CPU groups by default.
+        grace_episodes: Number of episodes before a trial can be stopped early.
+        min_trials: Number of other trials reporting the same episode needed to stop a trial.
+        early_stopping: Whether to stop the trials with the `MedianStoppingRule`.
+        csv_file: Optional path of the CSV file with the results.
+
+    Returns:
+        list of dict: Results of the trials sorted by the final win rate, the configuration, the final and the best win
+        rate, the number of episodes, whether the trial was stopped early, its wall clock and CPU seconds and the
+        error of a failed trial.
+    """
+    context = multiprocessing.get_context('spawn')
+    groups = cpu_groups(threads_per_trial)
+    workers = min(workers or len(groups), len(groups))
+    queue = context.Queue()
+    for group in groups[:workers]:
+        queue.put(group)
+
+    start = time.time()
+    results = []
+    with context.Manager() as manager:
+        stopping_rule = MedianStoppingRule(manager.dict(), grace_episodes, min_trials) if early_stopping else None
+        tasks = [(trial, trial_id, config, threads_per_trial, stopping_rule) for trial_id, config in enumerate(configs)]
+        with _thread_limits(threads_per_trial), context.Pool(workers, _pin_worker, (queue,)) as pool:
+            for result in pool.imap_unordered(_run_trial, tasks):
+                if result['error']:
+                    print("trial %s failed: %s" % (result['trial'], result['error']))
+                else:
+                    print("trial %s finished: win rate: %.3f episodes: %s seconds: %.1f%s" %
+                          (result['trial'], result['win_rate'], result['episodes'], result['seconds'],
+                           " (stopped early)" if result['stopped_early'] else ""))
+                results.append(result)
+    elapsed = time.time() - start
+
+    results.sort(key=lambda result: (math.isnan(result['win_rate']), -result['win_rate']))
+    if csv_file is not None:
+        _write_csv(csv_file, results)
+    print_results(results)
+    cpu_hours = elapsed * workers * threads_per_trial / 3600.
+    print("%s trials in %.1fs on %s CPUs, %.1f trials per CPU hour" %
+          (len(results), elapsed, workers * threads_per_trial, len(results) / max(cpu_hours, 1e-9)))
+    return results
+
+
+def _columns(results):
+    columns = []
+    for result in results:
+        columns.extend(key for key in result if key not in columns)
+    return columns
+
+
+def _write_csv(path, results):
+    with open(path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, _columns(results))
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def _format(value):
+    if isinstance(value, float):
+        return '%.4g' % value
+    return str(value)
+
+
+def print_results(results):
+    """Prints the results as a table."""
+    columns = _columns(results)
+    rows = [[_format(result.get(column, '')) for column in columns] for result in results]
+    widths = [max(len(cell) for cell in cells) for cells in zip(columns, *rows)]
+    for cells in [columns] + rows:
+        print('  '.join(cell.rjust(width) for cell, width in zip(cells, widths)))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'policy_gradient':
+        run_sweep(policy_gradient_trial,
+                  grid_search({'layers': [[9, 100, 9], [9, 100, 100, 9], [9, 100, 100, 100, 9]],
+                               'learning_rate': [1e-4, 3e-4, 1e-3],
+                               'batch_size': [50, 100],
+                               'games': [20000]}),
+                  threads_per_trial=2, grace_episodes=5000, csv_file='policy_gradient_sweep.csv')
+    else:
+        run_sweep(q_learning_trial,
+                  random_search({'learning_rate': (0.05, 1.), 'discount': (0.5, 0.99), 'games': [20000]}, trials=16),
+                  grace_episodes=5000, csv_file='q_learning_sweep.csv')